@@ -0,0 +1,48 @@
+"""
+Compares the monolithic solve against cluster-first, route-second decomposition
+on synthetic instances of increasing size, with the same time limit.
+
+Usage: python -m benchmarks.bench_decomposition --sizes 200 500 1000 --time-limit 30 --layout clustered
+"""
+import argparse
+import time
+from benchmarks.instances import synthetic_instance
+from helper.decomposition import solve_decomposed
+from helper.solver import solve_routing, get_search_parameters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 500, 1000])
+    parser.add_argument("--layout", choices=["uniform", "clustered"], default="uniform")
+    parser.add_argument("--stops-per-vehicle", type=int, default=25)
+    parser.add_argument("--max-cluster-size", type=int, default=150)
+    parser.add_argument("--time-limit", type=int, default=30)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        # Real lat/lon around the depot, as sweep_clusters expects
+        instance = synthetic_instance(size, args.layout, stops_per_vehicle=args.stops_per_vehicle)
+        instance.pop("addresses")
+        coordinates = instance.pop("coordinates")
+
+        started = time.monotonic()
+        _, _, solution = solve_routing(**instance, optimize_by="Distance",
+                                       search_parameters=get_search_parameters(args.time_limit))
+        monolithic = solution.ObjectiveValue() if solution else None
+        monolithic_seconds = round(time.monotonic() - started, 2)
+
+        _, _, _, report = solve_decomposed(**instance, coordinates=coordinates, optimize_by="Distance",
+                                           time_limit=args.time_limit, max_cluster_size=args.max_cluster_size)
+
+        gap = round(100 * (report["objective"] - monolithic) / monolithic, 2) if monolithic and report["objective"] else None
+        print({
+            "stops": size,
+            "monolithic_objective": monolithic,
+            "monolithic_seconds": monolithic_seconds,
+            "decomposed_objective": report["objective"],
+            "stitched_objective": report["stitched_objective"],
+            "decomposed_seconds": report["seconds"],
+            "clusters": report["clusters"],
+            "gap_percent": gap,  # negative means decomposition found the better plan
+        })
@@ -0,0 +1,65 @@
+"""
+Compares time-to-target-quality of the dense model against granular
+k-nearest-neighbor models (forbidden or penalized non-candidate arcs).
+
+The target is the dense model's final objective plus --target-gap percent;
+each run records the wall time of every improving solution.
+
+Usage: python -m benchmarks.bench_granular --stops 500 --k 10 30 --time-limit 30
+"""
+import argparse
+from benchmarks.instances import random_instance
+from helper.solver import build_routing_model, get_search_parameters
+
+
+# Function to run one solve and record (seconds, objective) for every improving solution
+def run(instance, time_limit, candidate_k=None, candidate_mode="penalize"):
+    manager, routing = build_routing_model(**instance, optimize_by="Distance",
+                                           candidate_k=candidate_k, candidate_mode=candidate_mode)
+    distance_matrix = instance["distance_matrix"]
+    trace = []
+
+    def record():
+        # Re-cost with the real distances, so penalized models are comparable
+        distance = 0
+        for vehicle in range(routing.vehicles()):
+            index = routing.Start(vehicle)
+            while not routing.IsEnd(index):
+                next_index = routing.NextVar(index).Value()
+                distance += int(distance_matrix[manager.IndexToNode(index)][manager.IndexToNode(next_index)])
+                index = next_index
+        trace.append((routing.solver().WallTime() / 1000, distance))
+
+    routing.AddAtSolutionCallback(record)
+    routing.SolveWithParameters(get_search_parameters(time_limit))
+    return trace
+
+
+def time_to_target(trace, target):
+    return next((round(seconds, 2) for seconds, objective in trace if objective <= target), None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stops", type=int, default=500)
+    parser.add_argument("--vehicles", type=int, default=20)
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 30])
+    parser.add_argument("--time-limit", type=int, default=30)
+    parser.add_argument("--target-gap", type=float, default=1.0)
+    args = parser.parse_args()
+
+    instance = random_instance(args.stops, args.vehicles)
+    runs = {"dense": run(instance, args.time_limit)}
+    for k in args.k:
+        runs[f"forbid_k{k}"] = run(instance, args.time_limit, k, "forbid")
+        runs[f"penalize_k{k}"] = run(instance, args.time_limit, k, "penalize")
+
+    target = runs["dense"][-1][1] * (1 + args.target_gap / 100)
+    for label, trace in runs.items():
+        print({
+            "model": label,
+            "final_distance": trace[-1][1] if trace else None,
+            "target": round(target),
+            "seconds_to_target": time_to_target(trace, target),
+            "improving_solutions": len(trace),
+        })
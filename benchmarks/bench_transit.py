@@ -0,0 +1,65 @@
+"""
+Compares search throughput of Python transit callbacks against matrix-registered transits
+for the same instance and time limit.
+
+Usage: python -m benchmarks.bench_transit --stops 200 --time-limit 10
+"""
+import argparse
+from helper.solver import build_routing_model, get_search_parameters
+from ortools.constraint_solver import pywrapcp
+from benchmarks.instances import random_instance
+
+
+# Function to build the model the way solve_vrp did before matrix registration
+def build_callback_model(distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot):
+    """Builds the same model as build_routing_model, but with per-arc Python callbacks."""
+    manager = pywrapcp.RoutingIndexManager(len(distance_matrix), num_vehicles, depot)
+    routing = pywrapcp.RoutingModel(manager)
+
+    def distance_callback(from_index, to_index):
+        return int(distance_matrix[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)])
+
+    def duration_callback(from_index, to_index):
+        return int(duration_matrix[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)])
+
+    def demand_callback(from_index):
+        return demands[manager.IndexToNode(from_index)]
+
+    distance_callback_index = routing.RegisterTransitCallback(distance_callback)
+    duration_callback_index = routing.RegisterTransitCallback(duration_callback)
+    routing.AddDimension(duration_callback_index, 0, 86400, False, "Time")
+    routing.SetArcCostEvaluatorOfAllVehicles(distance_callback_index)
+    demand_callback_index = routing.RegisterUnaryTransitCallback(demand_callback)
+    routing.AddDimensionWithVehicleCapacity(demand_callback_index, 0, vehicle_capacities, True, "Capacity")
+    return manager, routing
+
+
+# Function to run one solve and collect search statistics
+def run(label, manager, routing, time_limit):
+    solutions = []
+    routing.AddAtSolutionCallback(lambda: solutions.append(routing.CostVar().Value()))
+    solution = routing.SolveWithParameters(get_search_parameters(time_limit=time_limit))
+
+    solver = routing.solver()
+    seconds = solver.WallTime() / 1000
+    stats = {
+        "model": label,
+        "objective": solution.ObjectiveValue() if solution else None,
+        "improving_solutions": len(solutions),
+        "branches_per_second": round(solver.Branches() / seconds, 1),
+        "solutions_per_second": round(len(solutions) / seconds, 2),
+    }
+    print(stats)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stops", type=int, default=200)
+    parser.add_argument("--vehicles", type=int, default=5)
+    parser.add_argument("--time-limit", type=int, default=10)
+    args = parser.parse_args()
+
+    instance = random_instance(args.stops, args.vehicles)
+    run("python_callbacks", *build_callback_model(**instance), args.time_limit)
+    run("transit_matrix", *build_routing_model(**instance), args.time_limit)
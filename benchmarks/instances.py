@@ -0,0 +1,103 @@
+import numpy as np
+from helper.haversine import haversine_matrix
+
+# Function to generate a random VRP instance for benchmarking
+def random_instance(num_stops, num_vehicles=5, seed=0, area_m=10_000, speed_mps=8.0, with_coordinates=False):
+    """Generate a random capacitated VRP instance with Euclidean matrices.
+
+    Returns:
+        dict: distance_matrix and duration_matrix (int32 N×N), demands, vehicle_capacities,
+              num_vehicles and depot, ready to pass to helper.solver.solve_routing.
+              With with_coordinates=True it also holds planar "coordinates" in meters.
+    """
+    rng = np.random.default_rng(seed)
+    points = rng.random((num_stops, 2)) * area_m
+    distance_matrix = np.rint(np.hypot(*(points[:, None, :] - points[None, :, :]).transpose(2, 0, 1))).astype(np.int32)
+    duration_matrix = np.rint(distance_matrix / speed_mps).astype(np.int32)
+
+    demands = rng.integers(1, 10, size=num_stops)
+    demands[0] = 0  # depot
+    capacity = int(np.ceil(demands.sum() / num_vehicles * 1.2))
+
+    instance = {
+        "distance_matrix": distance_matrix,
+        "duration_matrix": duration_matrix,
+        "demands": demands.tolist(),
+        "vehicle_capacities": [capacity] * num_vehicles,
+        "num_vehicles": num_vehicles,
+        "depot": 0,
+    }
+    if with_coordinates:
+        instance["coordinates"] = points.tolist()
+    return instance
+
+# Times Square, so synthetic stops fall in the same city as orders.json
+DEFAULT_CENTER = (40.7580, -73.9855)
+METERS_PER_DEGREE = 111_320
+# Vehicle types of a mixed fleet, as relative capacities (van, box truck, semi)
+FLEET_MIX = (1, 2, 4)
+
+# Function to generate a realistic geographic VRP instance for the benchmark suite
+def synthetic_instance(num_stops, layout="uniform", num_vehicles=None, seed=0, center=DEFAULT_CENTER,
+                       radius_km=15, stops_per_vehicle=25, capacity_slack=1.25):
+    """Generate a seeded VRP instance with real (lat, lon) stops around a city center.
+
+    Args:
+        num_stops (int): Number of nodes including the depot, which sits at the center.
+        layout (str): "uniform" spreads stops over the disc, "clustered" groups them around
+            a few random neighborhoods.
+        num_vehicles (int): Fleet size, by default one vehicle per stops_per_vehicle stops.
+        seed (int): Seed of the generator; the same arguments always give the same instance.
+        center (tuple): (latitude, longitude) of the depot.
+        radius_km (float): Radius of the service area.
+        stops_per_vehicle (int): Stops per vehicle when num_vehicles is not given.
+        capacity_slack (float): Total fleet capacity divided by total demand.
+
+    Returns:
+        dict: addresses, demands, coordinates, vehicle_capacities, num_vehicles, depot and
+              great-circle distance_matrix/duration_matrix, i.e. the arguments of
+              route_optimization.solve_vrp with coordinates and matrices injected.
+    """
+    if layout not in ("uniform", "clustered"):
+        raise ValueError(f"Unknown layout: {layout}")
+    rng = np.random.default_rng(seed)
+    radius_m = radius_km * 1000
+    num_vehicles = num_vehicles or max(1, num_stops // stops_per_vehicle)
+
+    if layout == "uniform":
+        # Uniform over the disc: sqrt of a uniform radius keeps the density constant
+        angles = rng.random(num_stops) * 2 * np.pi
+        distances = np.sqrt(rng.random(num_stops)) * radius_m
+        offsets = np.column_stack((np.sin(angles), np.cos(angles))) * distances[:, None]
+    else:
+        num_clusters = max(2, int(np.sqrt(num_stops / 10)))
+        centers = (rng.random((num_clusters, 2)) * 2 - 1) * radius_m * 0.7
+        offsets = centers[rng.integers(num_clusters, size=num_stops)]
+        offsets = offsets + rng.normal(scale=radius_m / 15, size=(num_stops, 2))
+    offsets[0] = 0  # depot
+
+    # Offsets in meters (north, east) to degrees
+    lat = center[0] + offsets[:, 0] / METERS_PER_DEGREE
+    lon = center[1] + offsets[:, 1] / (METERS_PER_DEGREE * np.cos(np.radians(center[0])))
+    coordinates = [(float(a), float(b)) for a, b in zip(lat, lon)]
+
+    # Mostly parcels with a tail of bulky orders
+    demands = np.where(rng.random(num_stops) < 0.9, rng.integers(1, 6, size=num_stops), rng.integers(10, 31, size=num_stops))
+    demands[0] = 0
+
+    # Mixed fleet scaled so the total capacity covers the demand with some slack
+    mix = rng.choice(FLEET_MIX, size=num_vehicles)
+    unit = np.ceil(demands.sum() * capacity_slack / mix.sum())
+    vehicle_capacities = np.maximum(mix * unit, demands.max()).astype(int)
+
+    distance_matrix, duration_matrix = haversine_matrix(coordinates)
+    return {
+        "addresses": ["Depot"] + [f"Synthetic stop {i}" for i in range(1, num_stops)],
+        "demands": demands.tolist(),
+        "coordinates": coordinates,
+        "vehicle_capacities": vehicle_capacities.tolist(),
+        "num_vehicles": num_vehicles,
+        "depot": 0,
+        "distance_matrix": distance_matrix,
+        "duration_matrix": duration_matrix,
+    }
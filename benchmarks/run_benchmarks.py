@@ -0,0 +1,112 @@
+"""
+Offline benchmark suite: runs solve_vrp and solve_tsp on seeded synthetic
+instances with injected matrices, so no network or API keys are needed.
+
+Every run records the wall time of each pipeline stage, the objective, the
+real route distance and the search effort. Results are written as JSON so
+they can be diffed between commits to catch regressions.
+
+Usage: python -m benchmarks.run_benchmarks --sizes 10 100 1000 --layouts uniform clustered --output benchmark_results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+import ortools
+from benchmarks.instances import synthetic_instance
+from route_optimization import solve_vrp, solve_tsp
+
+
+def route_distance(routes, distance_matrix):
+    return int(sum(distance_matrix[a][b] for route in routes for a, b in zip(route, route[1:])))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Function to run one solver on one instance and collect its report
+def run(problem, instance, time_limit, decompose, verbose):
+    report = {}
+    matrices = (instance["distance_matrix"], instance["duration_matrix"])
+    started = time.perf_counter()
+
+    # The pipeline prints its matrices and plans; keep them out of the benchmark output
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        if problem == "vrp":
+            *_, routes, _, _, _ = solve_vrp(
+                instance["addresses"], instance["demands"], instance["vehicle_capacities"],
+                instance["num_vehicles"], instance["depot"], decompose=decompose,
+                coordinates=instance["coordinates"], matrices=matrices, time_limit=time_limit, report=report,
+            )
+        else:
+            _, routes, *_ = solve_tsp(
+                addresses_and_demands=list(zip(instance["addresses"], instance["demands"])),
+                coordinates=instance["coordinates"], matrices=matrices, report=report, use_cache=False,
+            )
+
+    report["seconds"]["total"] = round(time.perf_counter() - started, 4)
+    report["distance"] = route_distance(routes, instance["distance_matrix"]) if routes else None
+    report["vehicles_used"] = sum(len(route) > 2 for route in routes)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--layouts", nargs="+", default=["uniform", "clustered"], choices=["uniform", "clustered"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=int, default=10)
+    parser.add_argument("--decompose-above", type=int, default=1500,
+                        help="solve larger VRPs with cluster-first, route-second decomposition")
+    parser.add_argument("--tsp-max-stops", type=int, default=1000, help="skip the TSP above this size")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own output")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "ortools": ortools.__version__,
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "time_limit": args.time_limit,
+        },
+        "runs": [],
+    }
+
+    for size in args.sizes:
+        for layout in args.layouts:
+            started = time.perf_counter()
+            instance = synthetic_instance(size, layout, seed=args.seed)
+            generate_seconds = round(time.perf_counter() - started, 4)
+
+            problems = ["vrp"] + (["tsp"] if size <= args.tsp_max_stops else [])
+            for problem in problems:
+                decompose = problem == "vrp" and size > args.decompose_above
+                record = {
+                    "problem": problem,
+                    "layout": layout,
+                    "stops": size,
+                    "vehicles": instance["num_vehicles"] if problem == "vrp" else 1,
+                    "decomposed": decompose,
+                    "generate_seconds": generate_seconds,
+                    **run(problem, instance, args.time_limit, decompose, args.verbose),
+                }
+                results["runs"].append(record)
+                print(json.dumps(record))
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"📝 Wrote {len(results['runs'])} runs to {args.output}")
@@ -0,0 +1,223 @@
+"""
+Local stand-in for the Nominatim, Geoapify Route Matrix/Routing and
+OpenWeatherMap APIs, for load tests and benchmarks without network access.
+
+Responses are deterministic: an address always geocodes to the same point
+near --center, matrices are great-circle estimates and routes are straight
+legs. Latency and error rates are configurable; failures are 503s, which the
+pipeline's sessions retry with backoff. GET /stats returns the request count
+per endpoint, e.g. to check cache hit rates.
+
+The app is pointed at it by NOMINATIM_URL (geocoding, helper/address_to_coordinates.py),
+GEOAPIFY_BASE_URL (route matrix and routing, helper/matrix.py and helper/map.py) and
+OPENWEATHER_BASE_URL (weather, helper/weather.py); each defaults to the public API.
+
+Usage:
+    python -m benchmarks.stub_server --port 8765 --latency 0.2 --error-rate 0.05
+
+    NOMINATIM_URL=http://127.0.0.1:8765 GEOAPIFY_BASE_URL=http://127.0.0.1:8765 \\
+    OPENWEATHER_BASE_URL=http://127.0.0.1:8765 GEOAPIFY_API_KEY=stub NOMINATIM_RATE=1000 \\
+    streamlit run main.py
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from helper.geocode_cache import normalize_address
+from helper.haversine import haversine_matrix
+
+METERS_PER_DEGREE = 111_320
+# Intermediate points per routed leg, so geometry payloads have a realistic size
+POINTS_PER_LEG = 20
+
+
+# Function to map a string to a stable number in [0, 1)
+def stable_fraction(text, salt=""):
+    digest = hashlib.sha256(f"{salt}:{text}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        routes = {
+            "/search": self.search,
+            "/v1/routing": self.routing,
+            "/data/2.5/weather": self.weather,
+            "/stats": self.stats,
+        }
+        self.dispatch(url.path, routes, query)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            return self.reply(400, {"error": "Invalid JSON body"})
+        self.dispatch(url.path, {"/v1/routematrix": self.route_matrix}, payload)
+
+    def dispatch(self, path, routes, params):
+        handler = routes.get(path)
+        if handler is None:
+            return self.reply(404, {"error": f"Unknown endpoint {path}"})
+
+        config = self.server.config
+        if path != "/stats":
+            with self.server.lock:
+                self.server.requests[path] += 1
+                failed = self.server.rng.random() < config.error_rate
+            time.sleep(max(0.0, config.latency + random.uniform(-config.jitter, config.jitter)))
+            if failed:
+                with self.server.lock:
+                    self.server.requests["errors"] += 1
+                return self.reply(503, {"error": "Injected failure"})
+
+        try:
+            self.reply(200, handler(params))
+        except (KeyError, ValueError, TypeError) as e:
+            self.reply(400, {"error": f"Bad request: {e}"})
+
+    def reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.config.verbose:
+            super().log_message(format, *args)
+
+    # --- Endpoints ---
+
+    def search(self, query):
+        """Nominatim /search: a stable point per normalized address, or no results."""
+        config = self.server.config
+        address = normalize_address(query["q"])
+        if stable_fraction(address, "miss") < config.no_result_rate:
+            return []
+        lat0, lon0 = config.center
+        # Uniform over the disc around the center
+        radius_m = config.radius_km * 1000 * math.sqrt(stable_fraction(address, "radius"))
+        angle = 2 * math.pi * stable_fraction(address, "angle")
+        lat = lat0 + radius_m * math.sin(angle) / METERS_PER_DEGREE
+        lon = lon0 + radius_m * math.cos(angle) / (METERS_PER_DEGREE * math.cos(math.radians(lat0)))
+        return [{"lat": f"{lat:.7f}", "lon": f"{lon:.7f}", "display_name": query["q"]}]
+
+    def route_matrix(self, payload):
+        """Geoapify /v1/routematrix: great-circle estimates for every source×target pair."""
+        # Geoapify locations are [lon, lat]
+        sources = [(lat, lon) for lon, lat in (item["location"] for item in payload["sources"])]
+        targets = [(lat, lon) for lon, lat in (item["location"] for item in payload["targets"])]
+        distances, times = haversine_matrix(sources + targets)
+        return {
+            "sources_to_targets": [
+                [
+                    {
+                        "source_index": i,
+                        "target_index": j,
+                        "distance": int(distances[i, len(sources) + j]),
+                        "time": int(times[i, len(sources) + j]),
+                    }
+                    for j in range(len(targets))
+                ]
+                for i in range(len(sources))
+            ]
+        }
+
+    def routing(self, query):
+        """Geoapify /v1/routing: one straight, densified leg per pair of consecutive waypoints."""
+        waypoints = [tuple(map(float, point.split(","))) for point in query["waypoints"].split("|")]
+        if len(waypoints) < 2:
+            raise ValueError("At least two waypoints are required")
+        legs = []
+        for (lat1, lon1), (lat2, lon2) in zip(waypoints, waypoints[1:]):
+            legs.append([
+                [lon1 + (lon2 - lon1) * step / POINTS_PER_LEG, lat1 + (lat2 - lat1) * step / POINTS_PER_LEG]
+                for step in range(POINTS_PER_LEG + 1)
+            ])
+        return {
+            "type": "FeatureCollection",
+            "features": [{
+                "type": "Feature",
+                "properties": {"mode": query.get("mode", "drive"), "waypoints": len(waypoints)},
+                "geometry": {"type": "MultiLineString", "coordinates": legs},
+            }],
+        }
+
+    def weather(self, query):
+        """OpenWeatherMap /data/2.5/weather: stable made-up weather per city."""
+        city = query["q"].strip().lower()
+        conditions = ["Clear", "Clouds", "Rain", "Snow", "Mist"]
+        return {
+            "name": query["q"],
+            "main": {
+                "temp": round(-5 + 35 * stable_fraction(city, "temp"), 1),
+                "humidity": int(20 + 75 * stable_fraction(city, "humidity")),
+            },
+            "weather": [{"main": conditions[int(len(conditions) * stable_fraction(city, "condition"))]}],
+            "wind": {"speed": round(12 * stable_fraction(city, "wind"), 1)},
+        }
+
+    def stats(self, _):
+        with self.server.lock:
+            return dict(self.server.requests)
+
+
+def create_server(host="127.0.0.1", port=8765, latency=0.0, jitter=0.0, error_rate=0.0, no_result_rate=0.0,
+                  center=(40.7580, -73.9855), radius_km=15, seed=0, verbose=False):
+    """Create the stub server; call serve_forever() on it, or run it in a thread for tests.
+
+    Args:
+        latency (float): Mean delay added to every response, in seconds.
+        jitter (float): Maximum random deviation from the latency, in seconds.
+        error_rate (float): Fraction of requests answered with 503 Service Unavailable.
+        no_result_rate (float): Fraction of addresses that Nominatim "cannot find".
+        center (tuple): (latitude, longitude) around which addresses are geocoded.
+        radius_km (float): Radius of the geocoded area.
+        seed (int): Seed of the error injection, for reproducible runs.
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.config = argparse.Namespace(
+        latency=latency, jitter=jitter, error_rate=error_rate, no_result_rate=no_result_rate,
+        center=center, radius_km=radius_km, verbose=verbose,
+    )
+    server.rng = random.Random(seed)
+    server.lock = threading.Lock()
+    server.requests = Counter()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="max random deviation from --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 503")
+    parser.add_argument("--no-result-rate", type=float, default=0.0, help="fraction of addresses not found")
+    parser.add_argument("--center", type=float, nargs=2, default=[40.7580, -73.9855], metavar=("LAT", "LON"))
+    parser.add_argument("--radius-km", type=float, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.latency, args.jitter, args.error_rate, args.no_result_rate,
+                           tuple(args.center), args.radius_km, args.seed, args.verbose)
+    print(f"🧪 Stub APIs listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,159 @@
+"""
+Batch order fulfillment: allocates the stock of the inventory store to all open
+order lines at once, on NumPy arrays, and writes back only what changed.
+
+Policies:
+    fifo            lines are served in arrival order; an item is fulfilled when its
+                    product still has enough stock (the behavior of inventory.fulfill_orders).
+    priority        like fifo, but orders with a higher priority are served first.
+    max_fulfilled   whole orders only, cheapest first (by their share of scarce stock),
+                    to maximize the number of completely fulfilled orders.
+
+Usage: python fulfillment.py --policy priority --dry-run
+"""
+import argparse
+import time
+import numpy as np
+import inventory_db
+
+POLICIES = ("fifo", "priority", "max_fulfilled")
+
+
+def _allocate_lines(products, quantities, stock):
+    """First-fit allocation of lines in the given order.
+
+    Per product, the running total of requested quantity is compared to the stock,
+    so the leading lines that all fit are allocated in one vectorized step. Only
+    the lines after a product's first shortfall are checked one by one, since a
+    smaller later line may still fit.
+
+    Returns:
+        ndarray: Boolean mask of fulfilled lines.
+    """
+    by_product = np.argsort(products, kind="stable")
+    sorted_products = products[by_product]
+    running = np.cumsum(quantities[by_product])
+    group_start = np.searchsorted(sorted_products, sorted_products)
+    running_in_product = running - (running[group_start] - quantities[by_product][group_start])
+
+    fulfilled = np.zeros(len(products), dtype=bool)
+    fulfilled[by_product[running_in_product <= stock[sorted_products]]] = True
+
+    remaining = stock - np.bincount(products[fulfilled], weights=quantities[fulfilled], minlength=len(stock)).astype(stock.dtype)
+    left, product_list, quantity_list = remaining.tolist(), products.tolist(), quantities.tolist()
+    for i in np.flatnonzero(~fulfilled).tolist():
+        product, quantity = product_list[i], quantity_list[i]
+        if 0 <= quantity <= left[product]:
+            left[product] -= quantity
+            fulfilled[i] = True
+    return fulfilled
+
+
+def _allocate_orders(line_order, products, quantities, stock, num_orders):
+    """All-or-nothing allocation of whole orders, cheapest share of scarce stock first.
+
+    Returns:
+        ndarray: Boolean mask of fulfilled lines.
+    """
+    # Cost of an order: the fraction of each product's stock it would use
+    share = quantities / np.maximum(stock[products], 1)
+    share[stock[products] < 0] = np.inf  # unknown products can never be served
+    cost = np.bincount(line_order, weights=share, minlength=num_orders)
+
+    starts = np.searchsorted(line_order, np.arange(num_orders))
+    ends = np.append(starts[1:], len(line_order))
+    left = stock.tolist()
+    product_list, quantity_list = products.tolist(), quantities.tolist()
+
+    fulfilled = np.zeros(len(products), dtype=bool)
+    for order in np.argsort(cost, kind="stable").tolist():
+        if not np.isfinite(cost[order]):
+            break
+        needed = {}
+        for i in range(starts[order], ends[order]):
+            needed[product_list[i]] = needed.get(product_list[i], 0) + quantity_list[i]
+        if all(quantity <= left[product] for product, quantity in needed.items()):
+            for product, quantity in needed.items():
+                left[product] -= quantity
+            fulfilled[starts[order]:ends[order]] = True
+    return fulfilled
+
+
+def fulfill_open_orders(policy="fifo", dry_run=False):
+    """Allocates stock to all open order lines in one batch.
+
+    Args:
+        policy (str): One of POLICIES.
+        dry_run (bool): Compute and report the allocation without writing it.
+
+    Returns:
+        dict: Lines and orders fulfilled, units allocated, records written, the wall
+              time of each phase and the throughput in order lines per second.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy {policy}, expected one of {POLICIES}")
+
+    started = time.perf_counter()
+    rows = inventory_db.get_open_lines()
+    stock_by_product = {item['product_id']: item['stock'] for item in inventory_db.get_inventory()}
+    report = {"policy": policy, "dry_run": dry_run, "lines": len(rows), "seconds": {}}
+    if not rows:
+        print("✅ No open order lines to fulfill")
+        return {**report, "orders": 0, "lines_fulfilled": 0, "orders_fulfilled": 0, "units_allocated": 0,
+                "products_changed": 0, "lines_per_second": None}
+
+    seq, priority, order_ids, line_numbers, product_ids, quantities = zip(*rows)
+    # Dense indices: lines are grouped by order (rows arrive sorted by seq)
+    _, line_order = np.unique(np.array(seq), return_inverse=True)
+    product_names, products = np.unique(np.array(product_ids), return_inverse=True)
+    quantities = np.array(quantities, dtype=np.int64)
+    stock = np.array([stock_by_product.get(name, -1) for name in product_names.tolist()], dtype=np.int64)
+    num_orders = int(line_order[-1]) + 1
+    report["seconds"]["load"] = round(time.perf_counter() - started, 4)
+
+    started = time.perf_counter()
+    if policy == "max_fulfilled":
+        fulfilled = _allocate_orders(line_order, products, quantities, stock, num_orders)
+    else:
+        ranking = np.arange(len(rows))
+        if policy == "priority":
+            ranking = np.lexsort((line_order, -np.array(priority)))
+        fulfilled = np.zeros(len(rows), dtype=bool)
+        fulfilled[ranking] = _allocate_lines(products[ranking], quantities[ranking], stock)
+
+    used = np.bincount(products[fulfilled], weights=quantities[fulfilled], minlength=len(stock)).astype(np.int64)
+    # An order is complete when none of its open lines is left unfulfilled
+    complete = np.bincount(line_order[~fulfilled], minlength=num_orders) == 0
+    report["seconds"]["allocate"] = round(time.perf_counter() - started, 4)
+
+    stock_used = [(str(product_names[p]), int(used[p])) for p in np.flatnonzero(used).tolist()]
+    fulfilled_lines = [(order_ids[i], line_numbers[i]) for i in np.flatnonzero(fulfilled).tolist()]
+    order_starts = np.searchsorted(line_order, np.arange(num_orders))
+    fulfilled_orders = [order_ids[order_starts[o]] for o in np.flatnonzero(complete).tolist()]
+
+    if not dry_run:
+        started = time.perf_counter()
+        inventory_db.apply_allocation(stock_used, fulfilled_lines, fulfilled_orders)
+        report["seconds"]["write"] = round(time.perf_counter() - started, 4)
+
+    total = sum(report["seconds"].values())
+    report.update({
+        "orders": num_orders,
+        "lines_fulfilled": len(fulfilled_lines),
+        "orders_fulfilled": len(fulfilled_orders),
+        "units_allocated": int(used.sum()),
+        "products_changed": len(stock_used),
+        "lines_per_second": round(len(rows) / total) if total else None,
+    })
+    action = "Planned" if dry_run else "Fulfilled"
+    print(f"📦 {action} {report['lines_fulfilled']} of {len(rows)} lines and {report['orders_fulfilled']} of "
+          f"{num_orders} orders with the {policy} policy ({report['lines_per_second']} lines/s)")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--policy", choices=POLICIES, default="fifo")
+    parser.add_argument("--dry-run", action="store_true", help="report the allocation without writing it")
+    args = parser.parse_args()
+    print(fulfill_open_orders(args.policy, args.dry_run))
@@ -1,8 +1,26 @@
 import requests
+import os
+from concurrent.futures import ThreadPoolExecutor
+from helper import geocode_cache
+from helper.rate_limiter import TokenBucket
+
+# Nominatim root; with a self-hosted instance, NOMINATIM_RATE can be raised past the public 1 request/s
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org").rstrip("/")
+
+# Nominatim usage policy allows at most 1 request per second
+nominatim_limiter = TokenBucket(rate=float(os.getenv("NOMINATIM_RATE", 1.0)), capacity=1)
 
 def get_coordinates(address):
-    """Convert a textual address into GPS coordinates using OpenStreetMap Nominatim API."""
-    url = "https://nominatim.openstreetmap.org/search"
+    """Convert a textual address into GPS coordinates using OpenStreetMap Nominatim API.
+
+    Results (including "no results") are cached on disk, so only cache misses
+    reach Nominatim and only those are rate limited.
+    """
+    cached = geocode_cache.lookup(address)
+    if cached is not geocode_cache.MISS:
+        return cached
+
+    url = f"{NOMINATIM_URL}/search"
     params = {
         "q": address,
         "format": "json",
@@ -13,13 +31,61 @@ def get_coordinates(address):
         "User-Agent": "SupplyChainRouteAgent/1.0 (tahasiraj242@gmail.com)"
     }
 
-    response = requests.get(url, params=params, headers=headers)
-    data = response.json()
+    nominatim_limiter.acquire()
+    try:
+        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # Transient failure: don't cache, so the next run retries
+        print(f"❌ Geocoding request failed for: {address} ({e})")
+        return None
 
     if data:
         lat = float(data[0]["lat"])
         lon = float(data[0]["lon"])
+        geocode_cache.store(address, (lat, lon))
         return lat, lon
     else:
         print(f"❌ No results found for: {address}")
+        geocode_cache.store(address, None)
         return None
+
+def geocode_many(addresses, max_workers=4):
+    """Geocode a batch of addresses concurrently.
+
+    Duplicate addresses are geocoded once, cache hits are answered without
+    touching the network, and misses are fanned out over a thread pool that
+    shares the Nominatim rate limiter (see NOMINATIM_RATE).
+
+    Args:
+        addresses (list): Address strings, duplicates allowed.
+        max_workers (int): Maximum number of concurrent requests.
+
+    Returns:
+        tuple: (coordinates, failed) where coordinates[i] is the (lat, lon) of
+               addresses[i] or None, and failed is the list of indices that
+               could not be geocoded. Indices always match the input order.
+    """
+    unique = {}
+    for address in addresses:
+        unique.setdefault(geocode_cache.normalize_address(address), address)
+
+    results = {}
+    misses = []
+    for key, address in unique.items():
+        cached = geocode_cache.lookup(address)
+        if cached is geocode_cache.MISS:
+            misses.append(key)
+        else:
+            results[key] = cached
+
+    if misses:
+        print(f"🌐 Geocoding {len(misses)} uncached of {len(unique)} unique addresses")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for key, coord in zip(misses, executor.map(get_coordinates, [unique[k] for k in misses])):
+                results[key] = coord
+
+    coordinates = [results[geocode_cache.normalize_address(address)] for address in addresses]
+    failed = [i for i, coord in enumerate(coordinates) if coord is None]
+    return coordinates, failed
@@ -0,0 +1,79 @@
+import os
+import numpy as np
+from helper.geocode_cache import normalize_address
+from helper.haversine import haversine_matrix
+
+# Stops closer than this (in meters, straight line) are served as one; 0 disables merging by proximity
+STOP_MERGE_RADIUS_M = float(os.getenv("STOP_MERGE_RADIUS_M", 0))
+
+
+def consolidate_by_destination(stops, depot=0):
+    """Merge orders going to the same destination into one stop.
+
+    Destinations are compared after normalize_address, so trivially different
+    spellings of one building share a stop. The depot is never merged with
+    other stops: its demand would be loaded onto every vehicle.
+
+    Args:
+        stops (list): (order_id, destination, demand) tuples.
+        depot (int): Index of the depot in stops.
+
+    Returns:
+        tuple: (addresses, demands, order_ids, depot) where order_ids[i] lists the
+               orders served at stop i and depot is re-indexed.
+    """
+    addresses, demands, order_ids = [], [], []
+    stop_of = {}
+    new_depot = None
+    for i, (order_id, destination, demand) in enumerate(stops):
+        key = normalize_address(destination)
+        if i == depot:
+            new_depot = len(addresses)
+        elif key in stop_of:
+            stop = stop_of[key]
+            demands[stop] += demand
+            order_ids[stop].append(order_id)
+            continue
+        else:
+            stop_of[key] = len(addresses)
+        addresses.append(destination)
+        demands.append(demand)
+        order_ids.append([order_id])
+
+    if len(addresses) < len(stops):
+        print(f"🧮 Consolidated {len(stops)} orders into {len(addresses)} stops by destination")
+    return addresses, demands, order_ids, new_depot
+
+
+def merge_nearby(coordinates, demands, order_ids, radius_m, depot=0):
+    """Merge geocoded stops within radius_m (straight line) of an earlier stop.
+
+    Stops are visited in order and each one that is still on its own absorbs the
+    later stops around it, so a stop is never moved more than radius_m. The depot
+    neither absorbs nor is absorbed.
+
+    Returns:
+        tuple: (kept, demands, order_ids, depot) where kept are the indices of the
+               surviving stops, with summed demands, merged order_ids and the
+               re-indexed depot.
+    """
+    n = len(coordinates)
+    distances, _ = haversine_matrix(coordinates, detour_factor=1.0)
+    representative = np.arange(n)
+    for i in range(n):
+        if i == depot or representative[i] != i:
+            continue
+        close = np.flatnonzero((distances[i] <= radius_m) & (representative == np.arange(n)))
+        close = close[(close > i) & (close != depot)]
+        representative[close] = i
+
+    kept = np.flatnonzero(representative == np.arange(n)).tolist()
+    merged_demands = {i: 0 for i in kept}
+    merged_orders = {i: [] for i in kept}
+    for i in range(n):
+        merged_demands[int(representative[i])] += demands[i]
+        merged_orders[int(representative[i])].extend(order_ids[i])
+
+    if len(kept) < n:
+        print(f"🧮 Merged {n} stops into {len(kept)} within {radius_m} m of each other")
+    return kept, [merged_demands[i] for i in kept], [merged_orders[i] for i in kept], kept.index(depot)
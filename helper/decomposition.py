@@ -0,0 +1,164 @@
+import math
+import multiprocessing
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from helper.optimize_by import get_optimize_by
+from helper.portfolio import share_matrices, attach_matrices
+from helper.routes import get_routes
+from helper.solver import build_routing_model, get_search_parameters, restore_solution
+
+# Share of the time budget spent on cluster solves; the rest refines the stitched plan
+CLUSTER_TIME_SHARE = 0.7
+
+
+def sweep_clusters(coordinates, demands, vehicle_capacities, depot=0, max_cluster_size=150):
+    """Partitions stops into capacity-aware clusters by sweeping around the depot.
+
+    Stops are ordered by polar angle around the depot and handed to vehicles
+    (largest first) until each is full, as in the classic sweep heuristic.
+    Consecutive vehicles are then grouped into clusters of at most
+    max_cluster_size stops, so every cluster can carry its own demand.
+
+    Returns:
+        list: (stop indices, vehicle indices) per cluster; the depot is not included.
+
+    Raises:
+        ValueError: If the fleet cannot carry the total demand.
+    """
+    coords = np.asarray(coordinates, dtype=np.float64)
+    lat0, lon0 = coords[depot]
+    stops = np.array([i for i in range(len(coords)) if i != depot], dtype=np.intp)
+    angles = np.arctan2(coords[stops, 0] - lat0, (coords[stops, 1] - lon0) * math.cos(math.radians(lat0)))
+    stops = stops[np.argsort(angles, kind="stable")].tolist()
+
+    # Sweep: fill vehicles one after another in angular order
+    vehicles = sorted(range(len(vehicle_capacities)), key=lambda v: -vehicle_capacities[v])
+    groups = []
+    current, load = [], 0
+    for i in stops:
+        if current and load + demands[i] > vehicle_capacities[vehicles[len(groups)]]:
+            if len(groups) + 1 == len(vehicles):
+                raise ValueError("Not enough vehicle capacity to carry all demands")
+            groups.append(current)
+            current, load = [], 0
+        current.append(i)
+        load += demands[i]
+    groups.append(current)
+
+    # Group consecutive vehicles into clusters of at most max_cluster_size stops
+    clusters = []
+    for v, group in zip(vehicles, groups):
+        if clusters and len(clusters[-1][0]) + len(group) <= max_cluster_size:
+            clusters[-1][0].extend(group)
+            clusters[-1][1].append(v)
+        else:
+            clusters.append((list(group), [v]))
+
+    # Spare vehicles go to the clusters with the least capacity headroom
+    for v in vehicles[len(groups):]:
+        headroom = [
+            sum(vehicle_capacities[u] for u in cluster_vehicles) - sum(demands[i] for i in cluster)
+            for cluster, cluster_vehicles in clusters
+        ]
+        clusters[headroom.index(min(headroom))][1].append(v)
+
+    return clusters
+
+
+def _solve_cluster(spec, nodes, demands, vehicle_capacities, optimize_by, time_limit):
+    """Worker: solves the sub-VRP over `nodes` (depot first) from the shared matrices."""
+    shm, (distance_matrix, duration_matrix) = attach_matrices(spec)
+    try:
+        block = np.ix_(nodes, nodes)
+        manager, routing = build_routing_model(
+            distance_matrix[block], duration_matrix[block], demands, vehicle_capacities,
+            len(vehicle_capacities), 0, optimize_by,
+        )
+    finally:
+        del distance_matrix, duration_matrix
+        shm.close()
+
+    solution = routing.SolveWithParameters(get_search_parameters(time_limit))
+    if not solution:
+        return None
+    # Translate local node indices back to the full instance
+    return [[nodes[i] for i in route] for route in get_routes(solution, routing, manager)]
+
+
+def solve_decomposed(distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot,
+                     coordinates, optimize_by=None, time_limit=10, max_cluster_size=150, refine=True,
+                     max_workers=None):
+    """Cluster-first, route-second VRP solve for very large instances.
+
+    Stops are split with sweep_clusters, each cluster is solved as its own sub-VRP in a
+    worker process (matrices shared, not copied), and the routes are stitched into one
+    plan. With refine=True the stitched plan seeds a search over the full model for the
+    rest of the time budget, which repairs poor cluster boundaries.
+
+    Returns:
+        tuple: (manager, routing, solution, report) with cluster and timing details in report.
+    """
+    optimize_by = optimize_by or get_optimize_by()
+    started = time.monotonic()
+    clusters = sweep_clusters(coordinates, demands, vehicle_capacities, depot, max_cluster_size)
+
+    # Clusters run in waves of max_workers; split the cluster budget across the waves
+    max_workers = max_workers or os.cpu_count() or 1
+    waves = math.ceil(len(clusters) / max_workers)
+    cluster_budget = time_limit * CLUSTER_TIME_SHARE if refine else time_limit - 1
+    # Fractional seconds are kept, so decomposition gets the same budget as a monolithic solve
+    cluster_time_limit = max(1, cluster_budget / waves)
+    print(f"🧩 Solving {len(clusters)} clusters of up to {max_cluster_size} stops in parallel")
+
+    shm, spec = share_matrices(distance_matrix, duration_matrix)
+    try:
+        # Spawned, not forked, like helper.solver_pool: the app's sqlite connections and threads must not leak in
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(
+                    _solve_cluster, spec, [depot] + cluster,
+                    [demands[depot]] + [demands[i] for i in cluster],
+                    [vehicle_capacities[v] for v in cluster_vehicles],
+                    optimize_by, cluster_time_limit,
+                )
+                for cluster, cluster_vehicles in clusters
+            ]
+            cluster_routes = [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if any(routes is None for routes in cluster_routes):
+        print("❌ At least one cluster has no feasible solution")
+        return None, None, None, {
+            "clusters": len(clusters),
+            "stitched_objective": None,
+            "objective": None,
+            "seconds": round(time.monotonic() - started, 2),
+        }
+
+    # Stitch: cluster vehicle k drives route k of that cluster
+    routes = [[depot, depot] for _ in range(num_vehicles)]
+    for (_, cluster_vehicles), local_routes in zip(clusters, cluster_routes):
+        for v, route in zip(cluster_vehicles, local_routes):
+            routes[v] = route
+
+    manager, routing, solution = restore_solution(
+        routes, distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot, optimize_by
+    )
+    report = {
+        "clusters": len(clusters),
+        "stitched_objective": solution.ObjectiveValue() if solution else None,
+        "cluster_seconds": round(time.monotonic() - started, 2),
+    }
+
+    remaining = time_limit - (time.monotonic() - started)
+    if refine and solution and remaining > 0:
+        refined = routing.SolveFromAssignmentWithParameters(solution, get_search_parameters(remaining))
+        if refined:
+            solution = refined
+    report["objective"] = solution.ObjectiveValue() if solution else None
+    report["seconds"] = round(time.monotonic() - started, 2)
+    return manager, routing, solution, report
@@ -0,0 +1,84 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+GEOCODE_CACHE_DB = os.getenv("GEOCODE_CACHE_DB", "geocode_cache.db")
+GEOCODE_CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", 90 * 24 * 3600))  # 90 days for found addresses
+GEOCODE_NEGATIVE_TTL = int(os.getenv("GEOCODE_NEGATIVE_TTL", 24 * 3600))  # 1 day for "no results"
+
+# Sentinel returned by lookup() when an address is not cached (None means "cached as not found")
+MISS = object()
+
+# Connect to the cache database (or create if not exists)
+conn = sqlite3.connect(GEOCODE_CACHE_DB, check_same_thread=False)
+lock = threading.Lock()
+
+conn.execute('''
+    CREATE TABLE IF NOT EXISTS geocodes (
+        address TEXT PRIMARY KEY,
+        lat REAL,
+        lon REAL,
+        created_at REAL NOT NULL
+    )
+''')
+conn.commit()
+
+# In-process layer so repeated lookups don't touch sqlite at all
+_memory = {}
+
+
+def normalize_address(address):
+    """Normalize an address so trivially different spellings share a cache entry."""
+    address = re.sub(r"\s+", " ", address.strip().lower())
+    address = re.sub(r"\s*,\s*", ", ", address)
+    return address.rstrip(" .,")
+
+
+def _expires_at(lat, created_at):
+    return created_at + (GEOCODE_CACHE_TTL if lat is not None else GEOCODE_NEGATIVE_TTL)
+
+
+def lookup(address):
+    """Return cached (lat, lon), None for a cached negative result, or MISS."""
+    key = normalize_address(address)
+    now = time.time()
+
+    entry = _memory.get(key)
+    if entry is not None:
+        coord, expires_at = entry
+        if expires_at > now:
+            return coord
+        del _memory[key]
+
+    with lock:
+        row = conn.execute(
+            "SELECT lat, lon, created_at FROM geocodes WHERE address = ?", (key,)
+        ).fetchone()
+    if row is None:
+        return MISS
+
+    lat, lon, created_at = row
+    expires_at = _expires_at(lat, created_at)
+    if expires_at <= now:
+        return MISS
+
+    coord = (lat, lon) if lat is not None else None
+    _memory[key] = (coord, expires_at)
+    return coord
+
+
+def store(address, coord):
+    """Cache a geocoding result; pass coord=None to cache a negative result."""
+    key = normalize_address(address)
+    lat, lon = coord if coord else (None, None)
+    created_at = time.time()
+
+    with lock:
+        conn.execute(
+            "INSERT OR REPLACE INTO geocodes (address, lat, lon, created_at) VALUES (?, ?, ?, ?)",
+            (key, lat, lon, created_at),
+        )
+        conn.commit()
+    _memory[key] = (coord, _expires_at(lat, created_at))
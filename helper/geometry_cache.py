@@ -0,0 +1,49 @@
+import json
+import os
+import polyline
+import sqlite3
+import threading
+from helper.matrix_cache import coord_key
+
+GEOMETRY_CACHE_DB = os.getenv("GEOMETRY_CACHE_DB", "geometry_cache.db")
+POLYLINE_PRECISION = 6  # ~0.1 m; encoded polylines are several times smaller than JSON
+
+# Connect to the cache database (or create if not exists)
+conn = sqlite3.connect(GEOMETRY_CACHE_DB, check_same_thread=False)
+lock = threading.Lock()
+
+conn.execute('''
+    CREATE TABLE IF NOT EXISTS segments (
+        mode TEXT NOT NULL,
+        source TEXT NOT NULL,
+        target TEXT NOT NULL,
+        geometry TEXT NOT NULL,
+        PRIMARY KEY (mode, source, target)
+    )
+''')
+conn.commit()
+
+
+def lookup(start_coords, end_coords, mode="drive"):
+    """Return the cached road geometry between two points as (lat, lon) tuples, or None."""
+    with lock:
+        row = conn.execute(
+            "SELECT geometry FROM segments WHERE mode = ? AND source = ? AND target = ?",
+            (mode, coord_key(start_coords), coord_key(end_coords)),
+        ).fetchone()
+    if row is None:
+        return None
+    geometry = row[0]
+    if geometry.startswith('['):  # entries written before geometries were polyline-encoded
+        return [tuple(point) for point in json.loads(geometry)]
+    return polyline.decode(geometry, POLYLINE_PRECISION)
+
+
+def store(start_coords, end_coords, geometry, mode="drive"):
+    """Cache the road geometry between two points as an encoded polyline."""
+    with lock:
+        conn.execute(
+            "INSERT OR REPLACE INTO segments (mode, source, target, geometry) VALUES (?, ?, ?, ?)",
+            (mode, coord_key(start_coords), coord_key(end_coords), polyline.encode(geometry, POLYLINE_PRECISION)),
+        )
+        conn.commit()
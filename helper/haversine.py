@@ -0,0 +1,34 @@
+import os
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_000
+# Road distance is longer than the great-circle distance; 1.3 is a typical urban detour index
+DETOUR_FACTOR = float(os.getenv("DETOUR_FACTOR", 1.3))
+AVERAGE_SPEED_KMH = float(os.getenv("AVERAGE_SPEED_KMH", 30))
+
+def haversine_matrix(coordinates, detour_factor=DETOUR_FACTOR, average_speed_kmh=AVERAGE_SPEED_KMH):
+    """Estimates road distance and duration matrices from great-circle distances.
+
+    Args:
+        coordinates (list): (latitude, longitude) tuples.
+        detour_factor (float): Multiplier from straight-line to road distance.
+        average_speed_kmh (float): Average driving speed used for durations.
+
+    Returns:
+        tuple: (distances, times) as N×N int32 arrays in meters and seconds.
+    """
+    lat, lon = np.radians(np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)).T
+
+    # Haversine formula, broadcast over all pairs with in-place ops to limit temporaries
+    a = np.sin(np.subtract.outer(lat, lat) / 2) ** 2
+    b = np.sin(np.subtract.outer(lon, lon) / 2)
+    b **= 2
+    b *= np.multiply.outer(np.cos(lat), np.cos(lat))
+    a += b
+    np.clip(a, 0, 1, out=a)
+    np.sqrt(a, out=a)
+    np.arcsin(a, out=a)
+
+    distances = a * (2 * EARTH_RADIUS_M * detour_factor)
+    times = distances / (average_speed_kmh / 3.6)
+    return np.rint(distances).astype(np.int32), np.rint(times).astype(np.int32)
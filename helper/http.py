@@ -0,0 +1,28 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeout in seconds applied to every outbound API request
+DEFAULT_TIMEOUT = (5, 30)
+
+def create_session(pool_size=10, retries=3, backoff_factor=0.5):
+    """Create a keep-alive session with a connection pool and retry/backoff on transient errors.
+
+    Args:
+        pool_size (int): Connections kept open per host; match it to the worker count.
+        retries (int): Retries per request on connection errors, 429 and 5xx responses.
+        backoff_factor (float): Exponential backoff base between retries, in seconds.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=None,  # the matrix API is a POST, retry it too
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
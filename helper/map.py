@@ -1,128 +1,273 @@
 import folium
 import requests
 import json
-from helper.map_tile import tile_providers, get_tile # Assuming these are correctly implemented
+from helper.map_tile import get_tile_provider
+from helper import geometry_cache
+from helper.http import create_session, DEFAULT_TIMEOUT
+from helper.simplify import simplify_path
+from concurrent.futures import ThreadPoolExecutor
 import click
 import os
 
 geoapify_api_key = os.getenv("GEOAPIFY_API_KEY")
-if not geoapify_api_key:
-    raise ValueError("GEOAPIFY_API_KEY not found in environment. Please check your .env file or hardcode temporarily.")
+# Geoapify API root; the Routing endpoint (/v1/routing) is appended
+GEOAPIFY_BASE_URL = os.getenv("GEOAPIFY_BASE_URL", "https://api.geoapify.com").rstrip("/")
+
+# Geoapify limits the number of waypoints per routing request
+ROUTING_MAX_WAYPOINTS = int(os.getenv("GEOAPIFY_ROUTING_MAX_WAYPOINTS", 50))
+ROUTING_WORKERS = int(os.getenv("GEOAPIFY_ROUTING_WORKERS", 4))
+# Polylines are simplified for this zoom level (a bit closer than the initial zoom of 12)
+MAP_SIMPLIFY_ZOOM = int(os.getenv("MAP_SIMPLIFY_ZOOM", 14))
+
+session = create_session(pool_size=ROUTING_WORKERS)
 
 # --- New helper function to get detailed route geometry ---
-def get_route_geometry(start_coords, end_coords):
+def get_waypoints_geometry(waypoints):
     """
-    Fetches detailed road geometry between two points using Geoapify Routing API.
+    Fetches detailed road geometry through a list of waypoints using a single Geoapify Routing API call.
 
     Args:
-        start_coords (tuple): (latitude, longitude) of the start point.
-        end_coords (tuple): (latitude, longitude) of the end point.
-        geoapify_api_key (str): Your Geoapify API key.
+        waypoints (list): (latitude, longitude) tuples, at most ROUTING_MAX_WAYPOINTS.
 
     Returns:
-        list: A list of (latitude, longitude) tuples representing the route path,
-              or an empty list if the API call fails.
+        list: One list of (latitude, longitude) tuples per leg (waypoint i to i+1),
+              or None if the API call fails.
     """
-    print(click.style(f"\nRequesting route from {start_coords} to {end_coords}", fg='green'))
-    waypoints = f"{start_coords[0]},{start_coords[1]}|{end_coords[0]},{end_coords[1]}"
-    api_url = f"https://api.geoapify.com/v1/routing?waypoints={waypoints}&mode=drive&apiKey={geoapify_api_key}"
+    if not geoapify_api_key:
+        # Checked per call so the app still starts without a key; the map falls back to straight lines
+        print(click.style("Warning: GEOAPIFY_API_KEY not found in environment. Please check your .env file.", fg='red'))
+        return None
+
+    print(click.style(f"\nRequesting route through {len(waypoints)} waypoints", fg='green'))
+    waypoints_param = "|".join(f"{lat},{lon}" for lat, lon in waypoints)
+    api_url = f"{GEOAPIFY_BASE_URL}/v1/routing?waypoints={waypoints_param}&mode=drive&apiKey={geoapify_api_key}"
 
+    response = None
     try:
-        response = requests.get(api_url)
+        response = session.get(api_url, timeout=DEFAULT_TIMEOUT)
         response.raise_for_status()
         data = response.json()
 
-        route_geometry = []
-        
         if 'features' in data and data['features']:
-            for feature in data['features']:
-                geometry = feature.get('geometry')
-                if geometry and geometry.get('type') == 'MultiLineString':
-                    coordinates_list = geometry.get('coordinates', [])
-                    for line in coordinates_list:
-                        for lon, lat in line:
-                            route_geometry.append((lat, lon))  # Folium expects (lat, lon)
-                    return route_geometry
-                else:
-                    print("Warning: Unsupported geometry type or missing geometry.")
+            geometry = data['features'][0].get('geometry')
+            if geometry and geometry.get('type') == 'MultiLineString':
+                # One line per leg; Folium expects (lat, lon)
+                legs = [[(lat, lon) for lon, lat in line] for line in geometry.get('coordinates', [])]
+                if len(legs) == len(waypoints) - 1:
+                    return legs
+                print(f"Warning: Expected {len(waypoints) - 1} legs, got {len(legs)}.")
+            else:
+                print("Warning: Unsupported geometry type or missing geometry.")
+            return None
         else:
             print(click.style("Warning: No route features found in response. Raw response:", fg='red'))
             print(json.dumps(data, indent=2)) # Print the JSON for inspection
-            return []
+            return None
 
     except requests.exceptions.RequestException as e:
         print(f"Error fetching route geometry from Geoapify: {e}")
         if response is not None:
             print(f"Raw response content (RequestException): {response.text}")
-        return []
+        return None
     except json.JSONDecodeError:
         print("Error decoding JSON response from Geoapify.")
         if response is not None:
             print(f"Raw response content (JSONDecodeError): {response.text}")
-        return []
+        return None
     except Exception as e: # Catch any other potential errors
         print(f"An unexpected error occurred: {e}")
         if response is not None:
             print(f"Raw response content (Unexpected Error): {response.text}")
-        return []
+        return None
+
+def get_route_geometry(start_coords, end_coords):
+    """
+    Fetches detailed road geometry between two points, using the geometry cache first.
+
+    Returns:
+        list: A list of (latitude, longitude) tuples representing the route path,
+              or an empty list if the API call fails.
+    """
+    return get_path_geometry([start_coords, end_coords])[0] or []
+
+def get_path_geometry(points):
+    """
+    Fetches road geometry for every consecutive segment of a single vehicle route.
+
+    Returns:
+        list: One entry per segment (points[i] to points[i+1]): a list of
+              (latitude, longitude) tuples, or None if it could not be fetched.
+    """
+    return get_paths_geometry([points])[0]
+
+def get_paths_geometry(paths, max_workers=ROUTING_WORKERS):
+    """
+    Fetches road geometry for every consecutive segment of several vehicle routes.
+
+    Cached segments are reused. Consecutive uncached segments are requested together
+    as multi-waypoint routes, chunked to ROUTING_MAX_WAYPOINTS, and the chunks of all
+    routes are fetched concurrently by a bounded worker pool sharing one keep-alive
+    session. Fetched legs are cached per segment.
+
+    Args:
+        paths (list): One list of (latitude, longitude) tuples per route, in visiting order.
+        max_workers (int): Maximum number of concurrent routing requests.
+
+    Returns:
+        list: For each path, one entry per segment: a list of (latitude, longitude)
+              tuples, or None if it could not be fetched.
+    """
+    all_segments = []
+    chunks = []  # (path index, segment indices) fetched by one request
+    for path_idx, points in enumerate(paths):
+        segments = []
+        missing_runs = []  # runs of consecutive uncached segment indices
+        for i in range(len(points) - 1):
+            start_coords, end_coords = tuple(points[i]), tuple(points[i + 1])
+            if start_coords == end_coords:
+                segments.append([start_coords])
+                continue
+            cached = geometry_cache.lookup(start_coords, end_coords)
+            segments.append(cached)
+            if cached is None:
+                if missing_runs and missing_runs[-1][-1] == i - 1:
+                    missing_runs[-1].append(i)
+                else:
+                    missing_runs.append([i])
+        all_segments.append(segments)
 
-def create_map(coordinates, addresses, routes, demands):
-    style = get_tile()
-    tile_info = tile_providers.get(style, tile_providers["OpenStreetMap"])
+        for run in missing_runs:
+            # Chunks share their boundary waypoint, so each holds up to ROUTING_MAX_WAYPOINTS - 1 legs
+            for chunk_start in range(0, len(run), ROUTING_MAX_WAYPOINTS - 1):
+                chunks.append((path_idx, run[chunk_start:chunk_start + ROUTING_MAX_WAYPOINTS - 1]))
 
+    if not chunks:
+        return all_segments
+
+    waypoints_list = [
+        [tuple(paths[path_idx][i]) for i in chunk] + [tuple(paths[path_idx][chunk[-1] + 1])]
+        for path_idx, chunk in chunks
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(get_waypoints_geometry, waypoints_list))
+
+    for (path_idx, chunk), legs in zip(chunks, results):
+        if legs is None:
+            continue
+        points = paths[path_idx]
+        for i, leg in zip(chunk, legs):
+            all_segments[path_idx][i] = leg
+            geometry_cache.store(tuple(points[i]), tuple(points[i + 1]), leg)
+
+    return all_segments
+
+def build_route_layers(coordinates, addresses, routes, demands, simplify_zoom=MAP_SIMPLIFY_ZOOM, road_geometry=True):
+    """
+    Computes everything drawn on the route map except the tile layer.
+
+    This is the expensive part (road geometry), so build it once per solution and
+    pass the result to render_map for every tile change.
+
+    Polylines are simplified so they deviate by at most one pixel at simplify_zoom
+    (pass None to keep full resolution), which keeps the map HTML small. With
+    road_geometry=False stops are joined by straight lines without any routing API
+    call, which is enough to preview plans that are still being improved.
+
+    Returns:
+        dict: "center" as [lat, lon], "markers" as (lat, lon, popup, color) tuples and
+              "polylines" as (path, color, popup) tuples.
+    """
     avg_lat = sum(lat for lat, _ in coordinates) / len(coordinates)
     avg_lon = sum(lon for _, lon in coordinates) / len(coordinates)
-    m = folium.Map(location=[avg_lat, avg_lon], tiles=tile_info["tiles"], attr=tile_info["attr"], zoom_start=12)
 
-    for i, (lat, lon) in enumerate(coordinates):
-        popup_text = f"{addresses[i]}<br>Demand: {demands[i]}"
-        folium.Marker(
-            [lat, lon],
-            popup=popup_text,
-            icon=folium.Icon(color="green" if i == 0 else "blue")
-        ).add_to(m)
+    markers = [
+        (lat, lon, f"{addresses[i]}<br>Demand: {demands[i]}", "green" if i == 0 else "blue")
+        for i, (lat, lon) in enumerate(coordinates)
+    ]
 
     colors = ["red", "blue", "green", "purple", "orange", "yellow", "brown", "black", "gray", "pink", "cyan", "magenta"]
-    for vehicle_id, route_indices in enumerate(routes): # routes now contain indices from OR-Tools
-        # Skip empty routes or routes with only depot-depot
-        if len(route_indices) <= 2 and route_indices[0] == route_indices[-1] == 0:
-            continue
+    # Skip empty routes or routes with only depot-depot
+    drawn_routes = [
+        (vehicle_id, route_indices) for vehicle_id, route_indices in enumerate(routes) # routes now contain indices from OR-Tools
+        if not (len(route_indices) <= 2 and route_indices[0] == route_indices[-1] == 0)
+    ]
 
-        full_route_path = []
-        for i in range(len(route_indices) - 1):
-            start_node_idx = route_indices[i]
-            end_node_idx = route_indices[i+1]
+    if road_geometry:
+        # Prefetch geometry for all vehicles at once
+        paths_geometry = get_paths_geometry([
+            [coordinates[node_idx] for node_idx in route_indices] for _, route_indices in drawn_routes
+        ])
+    else:
+        paths_geometry = [
+            [[coordinates[a], coordinates[b]] for a, b in zip(route_indices, route_indices[1:])]
+            for _, route_indices in drawn_routes
+        ]
 
-            start_coords = coordinates[start_node_idx]
-            end_coords = coordinates[end_node_idx]
+    polylines = []
+    points_before = points_after = bytes_before = bytes_after = 0
+    for (vehicle_id, route_indices), path_geometry in zip(drawn_routes, paths_geometry):
+        full_route_path = []
+        for i, segment_geometry in enumerate(path_geometry):
+            start_coords = coordinates[route_indices[i]]
+            end_coords = coordinates[route_indices[i+1]]
 
-            # Get detailed geometry for this segment
-            segment_geometry = get_route_geometry(start_coords, end_coords)
             if segment_geometry:
                 full_route_path.extend(segment_geometry)
             else:
                 # Fallback: if API call fails, draw a straight line for this segment
-                print(f"Warning: Failed to get road geometry for segment from {addresses[start_node_idx]} to {addresses[end_node_idx]}. Drawing straight line.\n")
+                print(f"Warning: Failed to get road geometry for segment from {addresses[route_indices[i]]} to {addresses[route_indices[i+1]]}. Drawing straight line.\n")
                 full_route_path.append(start_coords)
                 if start_coords != end_coords: # Avoid adding duplicate points for same location
                     full_route_path.append(end_coords)
 
-        # Add the polyline for the entire vehicle route
+        # Keep the polyline for the entire vehicle route
         if full_route_path:
-            folium.PolyLine(
-                full_route_path,
-                color=colors[vehicle_id % len(colors)],
-                weight=5,
-                opacity=0.7,
-                popup=f"Vehicle {vehicle_id}"
-            ).add_to(m)
+            points_before += len(full_route_path)
+            bytes_before += len(json.dumps(full_route_path))
+            if simplify_zoom is not None:
+                full_route_path = simplify_path(full_route_path, simplify_zoom)
+            points_after += len(full_route_path)
+            bytes_after += len(json.dumps(full_route_path))
+
+            polylines.append((full_route_path, colors[vehicle_id % len(colors)], f"Vehicle {vehicle_id}"))
         else:
             print(f"No path drawn for vehicle {vehicle_id} due to missing geometry.")
 
+    if points_before:
+        print(f"🗜️ Route polylines: {points_before} → {points_after} points, "
+              f"{bytes_before / 1024:.1f} KB → {bytes_after / 1024:.1f} KB of coordinates")
+
+    return {"center": [avg_lat, avg_lon], "markers": markers, "polylines": polylines}
+
+def render_map(layers, tile="OpenStreetMap"):
+    """Draws precomputed route layers (see build_route_layers) on a Folium map with the given tile style."""
+    tile_info = get_tile_provider(tile)
+    m = folium.Map(location=layers["center"], tiles=tile_info["tiles"], attr=tile_info["attr"], zoom_start=12)
+
+    for lat, lon, popup_text, color in layers["markers"]:
+        folium.Marker(
+            [lat, lon],
+            popup=popup_text,
+            icon=folium.Icon(color=color)
+        ).add_to(m)
+
+    for path, color, popup_text in layers["polylines"]:
+        folium.PolyLine(
+            path,
+            color=color,
+            weight=5,
+            opacity=0.7,
+            popup=popup_text
+        ).add_to(m)
+
     return m
 
+def create_map(coordinates, addresses, routes, demands, tile="OpenStreetMap", simplify_zoom=MAP_SIMPLIFY_ZOOM):
+    """Builds the route layers and renders them with the given tile style in one step."""
+    return render_map(build_route_layers(coordinates, addresses, routes, demands, simplify_zoom), tile)
+
 
 if __name__ == "__main__":
     # Example usage
-    m = create_map([(40.7484421, -73.9856589), (40.7540576, -73.9822573)], ["50 5th Ave, New York, NY 10118", "W 42nd St, New York, NY 10036"], [[0, 1, 0]], [0, 5], geoapify_api_key)
-    m.save("test_map.html")
\ No newline at end of file
+    m = create_map([(40.7484421, -73.9856589), (40.7540576, -73.9822573)], ["50 5th Ave, New York, NY 10118", "W 42nd St, New York, NY 10036"], [[0, 1, 0]], [0, 5])
+    m.save("test_map.html")
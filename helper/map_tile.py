@@ -1,13 +1,3 @@
-
-tile = 'OpenStreetMap'
-
-def set_tile(style: str):
-    global tile
-    tile = style
-
-def get_tile():
-    return tile
-
 tile_providers = {
     "OpenStreetMap": {
         "tiles": "OpenStreetMap",
@@ -34,3 +24,7 @@ tile_providers = {
         'attr': '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors &amp; USGS'
     }
 }
+
+def get_tile_provider(style: str):
+    """Get the tiles URL and attribution for a tile style, falling back to OpenStreetMap."""
+    return tile_providers.get(style, tile_providers["OpenStreetMap"])
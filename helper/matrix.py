@@ -1,46 +1,59 @@
 import requests
 import os
 import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from helper import matrix_cache
+from helper.haversine import haversine_matrix
+from helper.http import create_session, DEFAULT_TIMEOUT
+from helper.matrix_cache import MISSING
 
 api_key = os.getenv("GEOAPIFY_API_KEY")
+# Geoapify API root; the Route Matrix endpoint (/v1/routematrix) is appended
+GEOAPIFY_BASE_URL = os.getenv("GEOAPIFY_BASE_URL", "https://api.geoapify.com").rstrip("/")
 
-def get_distance_duration_matrix(coordinates):
-    """Fetches distance matrix from Geoapify API."""
-    url = f"https://api.geoapify.com/v1/routematrix?apiKey={api_key}"
+# Geoapify limits how many sources×targets cells one request may contain
+MATRIX_TILE_SIZE = int(os.getenv("GEOAPIFY_MATRIX_TILE_SIZE", 30))
+MATRIX_WORKERS = int(os.getenv("GEOAPIFY_MATRIX_WORKERS", 4))
+
+session = create_session(pool_size=MATRIX_WORKERS)
+
+def _request_matrix(sources, targets, mode):
+    """Requests a sources×targets tile from the Geoapify Route Matrix API.
+
+    Returns:
+        tuple: (distances, times) as len(sources)×len(targets) int32 arrays with
+               MISSING for unreachable pairs, or None on failure.
+    """
+    url = f"{GEOAPIFY_BASE_URL}/v1/routematrix?apiKey={api_key}"
     headers = {"Content-Type": "application/json"}
 
     # Construct the Geoapify payload
-    sources = [{"location": [lon, lat]} for lat, lon in coordinates]  # Geoapify: [lon, lat]
-    targets = [{"location": [lon, lat]} for lat, lon in coordinates]  # Geoapify: [lon, lat]
     payload = {
-        "mode": "drive",
-        "sources": sources,
-        "targets": targets,
+        "mode": mode,
+        "sources": [{"location": [lon, lat]} for lat, lon in sources],  # Geoapify: [lon, lat]
+        "targets": [{"location": [lon, lat]} for lat, lon in targets],  # Geoapify: [lon, lat]
     }
     data = json.dumps(payload)
 
     try:
-        resp = requests.post(url, headers=headers, data=data)
+        resp = session.post(url, headers=headers, data=data, timeout=DEFAULT_TIMEOUT)
         resp.raise_for_status()
         matrix_data = resp.json()
 
-        # Extract distance matrix.
-        distances = []
-        times = []
-        if matrix_data and 'sources_to_targets' in matrix_data:
-            #  Iterate through sources and targets to build the matrix
-            for source_data in matrix_data['sources_to_targets']:
-                row_distances = []
-                row_times = []
-                for target_data in source_data:
-                    row_distances.append(target_data.get('distance', None))  # Get distance, None if missing
-                    row_times.append(target_data.get('time', None))  # Get time, None if missing
-                distances.append(row_distances)
-                times.append(row_times)
-        else:
+        if not matrix_data or 'sources_to_targets' not in matrix_data:
             print("Error: 'sources_to_targets' key not found in Geoapify response.")
             return None
 
+        # Extract distance matrix.
+        distances = np.full((len(sources), len(targets)), MISSING, dtype=np.int32)
+        times = np.full((len(sources), len(targets)), MISSING, dtype=np.int32)
+        for r, source_data in enumerate(matrix_data['sources_to_targets']):
+            for c, target_data in enumerate(source_data):
+                if target_data.get('distance') is not None and target_data.get('time') is not None:
+                    distances[r, c] = round(target_data['distance'])
+                    times[r, c] = round(target_data['time'])
+
         return distances, times
 
     except requests.exceptions.HTTPError as e:
@@ -51,4 +64,100 @@ def get_distance_duration_matrix(coordinates):
         return None
     except json.JSONDecodeError:
         print("Error: Could not decode JSON response from Geoapify.")
-        return None
\ No newline at end of file
+        return None
+
+def _split_tiles(rows, cols, tile_size):
+    """Split a rows×cols block into tiles of at most tile_size×tile_size."""
+    return [
+        (rows[r:r + tile_size], cols[c:c + tile_size])
+        for r in range(0, len(rows), tile_size)
+        for c in range(0, len(cols), tile_size)
+    ]
+
+def _fetch_tile(coordinates, rows, cols, mode):
+    sources = [coordinates[i] for i in rows]
+    targets = [coordinates[j] for j in cols]
+    result = _request_matrix(sources, targets, mode)
+    if result is not None:
+        matrix_cache.store(sources, targets, *result, mode)
+    return result
+
+def fetch_matrix(coordinates, mode="drive", tile_size=MATRIX_TILE_SIZE, max_workers=MATRIX_WORKERS):
+    """Builds distance and duration matrices from the cache plus concurrently fetched tiles.
+
+    Only pairs missing from the cache are requested. They are split into
+    source×target tiles that are fetched in parallel over a pooled session,
+    each retried with backoff. Cells that still could not be fetched are
+    reported in the returned mask instead of failing the whole matrix.
+
+    Returns:
+        tuple: (distances, times, missing) where distances and times are N×N
+               int32 arrays and missing is a boolean mask of cells holding
+               MISSING because their tile failed.
+    """
+    distances, times = matrix_cache.lookup(coordinates, mode)
+
+    n = len(coordinates)
+    # A stop whose self-pair is cached has had its row/column fetched before
+    is_new = np.diagonal(distances) == MISSING
+    new_nodes = np.flatnonzero(is_new).tolist()
+    known_nodes = np.flatnonzero(~is_new).tolist()
+
+    tiles = []
+    if new_nodes:
+        print(f"🌐 Fetching matrix rows/columns for {len(new_nodes)} of {n} stops")
+        # New stops need their full row and column
+        tiles += _split_tiles(new_nodes, list(range(n)), tile_size)
+        tiles += _split_tiles(known_nodes, new_nodes, tile_size)
+
+    # Known stops that were never part of the same request still miss their pairs
+    known = np.array(known_nodes, dtype=np.intp)
+    known_block = distances[np.ix_(known, known)] == MISSING
+    if known_block.any():
+        rows = known[np.flatnonzero(known_block.any(axis=1))].tolist()
+        cols = known[np.flatnonzero(known_block.any(axis=0))].tolist()
+        print(f"🌐 Fetching {int(known_block.sum())} missing pairs between cached stops")
+        tiles += _split_tiles(rows, cols, tile_size)
+
+    if not tiles:
+        print(f"✅ Matrix for {n} stops served entirely from cache")
+        return distances, times, np.zeros((n, n), dtype=bool)
+
+    print(f"🧩 Requesting {len(tiles)} matrix tiles with {max_workers} workers")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda tile: _fetch_tile(coordinates, *tile, mode), tiles))
+
+    failed_tiles = 0
+    for (rows, cols), result in zip(tiles, results):
+        if result is None:
+            failed_tiles += 1
+            continue
+        block = np.ix_(rows, cols)
+        distances[block], times[block] = result
+    if failed_tiles:
+        print(f"⚠️ {failed_tiles} of {len(tiles)} matrix tiles failed")
+
+    return distances, times, (distances == MISSING) | (times == MISSING)
+
+def get_distance_duration_matrix(coordinates, mode="drive", draft=False):
+    """Fetches distance and duration matrices as N×N int32 NumPy arrays.
+
+    Args:
+        coordinates (list): (latitude, longitude) tuples.
+        mode (str): Geoapify travel mode.
+        draft (bool): Skip the API and return great-circle estimates, for quick what-if solves.
+
+    Pairs that could not be fetched are filled with great-circle estimates and
+    reported, so a matrix is always returned.
+    """
+    if draft:
+        print(f"✏️ Draft mode: estimating matrix for {len(coordinates)} stops from great-circle distances")
+        return haversine_matrix(coordinates)
+
+    distances, times, missing = fetch_matrix(coordinates, mode)
+    if missing.any():
+        print(f"⚠️ FALLBACK: {int(missing.sum())} of {missing.size} matrix cells use great-circle estimates")
+        estimated_distances, estimated_times = haversine_matrix(coordinates)
+        distances[missing] = estimated_distances[missing]
+        times[missing] = estimated_times[missing]
+    return distances, times
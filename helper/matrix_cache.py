@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import threading
+import numpy as np
+
+MATRIX_CACHE_DB = os.getenv("MATRIX_CACHE_DB", "matrix_cache.db")
+COORD_PRECISION = 5  # ~1 m, so re-geocoded addresses still hit the cache
+MISSING = -1  # marks matrix cells that are not cached
+
+# Connect to the cache database (or create if not exists)
+conn = sqlite3.connect(MATRIX_CACHE_DB, check_same_thread=False)
+lock = threading.Lock()
+conn.execute("PRAGMA journal_mode=WAL")  # tiles are written concurrently with lookups
+conn.execute("PRAGMA synchronous=NORMAL")
+
+conn.execute('''
+    CREATE TABLE IF NOT EXISTS pairs (
+        mode TEXT NOT NULL,
+        source TEXT NOT NULL,
+        target TEXT NOT NULL,
+        distance INTEGER NOT NULL,
+        time INTEGER NOT NULL,
+        PRIMARY KEY (mode, source, target)
+    )
+''')
+conn.commit()
+
+
+def coord_key(coord):
+    """Cache key for a (lat, lon) pair, rounded so nearby duplicates share entries."""
+    lat, lon = coord
+    return f"{round(lat, COORD_PRECISION)},{round(lon, COORD_PRECISION)}"
+
+
+def lookup(coordinates, mode):
+    """Assemble the cached part of the N×N matrix.
+
+    Returns:
+        tuple: (distances, times) as N×N int32 arrays with MISSING for pairs not in the cache.
+    """
+    keys = [coord_key(coord) for coord in coordinates]
+    unique_keys = list(dict.fromkeys(keys))
+    key_index = {key: u for u, key in enumerate(unique_keys)}
+
+    # Fill a matrix over unique keys, then expand it to the (possibly duplicated) input order
+    k = len(unique_keys)
+    unique_distances = np.full((k, k), MISSING, dtype=np.int32)
+    unique_times = np.full((k, k), MISSING, dtype=np.int32)
+
+    for start in range(0, k, 500):  # stay under sqlite's host parameter limit
+        chunk = unique_keys[start:start + 500]
+        with lock:
+            rows = conn.execute(
+                f"SELECT source, target, distance, time FROM pairs "
+                f"WHERE mode = ? AND source IN ({','.join('?' * len(chunk))})",
+                (mode, *chunk),
+            ).fetchall()
+        for source, target, distance, time in rows:
+            c = key_index.get(target)
+            if c is not None:
+                r = key_index[source]
+                unique_distances[r, c] = distance
+                unique_times[r, c] = time
+
+    inverse = np.array([key_index[key] for key in keys], dtype=np.intp)
+    return unique_distances[np.ix_(inverse, inverse)], unique_times[np.ix_(inverse, inverse)]
+
+
+def store(sources, targets, distances, times, mode):
+    """Cache a sources×targets block; cells equal to MISSING are skipped."""
+    source_keys = [coord_key(coord) for coord in sources]
+    target_keys = [coord_key(coord) for coord in targets]
+    rows = [
+        (mode, source_keys[r], target_keys[c], int(distances[r, c]), int(times[r, c]))
+        for r, c in zip(*np.nonzero((distances != MISSING) & (times != MISSING)))
+    ]
+    with lock:
+        conn.executemany(
+            "INSERT OR REPLACE INTO pairs (mode, source, target, distance, time) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
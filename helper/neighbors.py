@@ -0,0 +1,57 @@
+import os
+import numpy as np
+
+# Granular neighborhoods for app solves: k nearest neighbors kept per stop, 0 keeps every arc
+CANDIDATE_K = int(os.getenv("CANDIDATE_K", 0))
+# "penalize" or "forbid", see helper.solver.build_routing_model
+CANDIDATE_MODE = os.getenv("CANDIDATE_MODE", "penalize")
+
+def knn_candidates(matrix, k, depot=0):
+    """Precomputes the granular candidate arcs of a cost matrix.
+
+    An arc i→j is a candidate if j is among the k cheapest successors of i or i is
+    among the k cheapest successors of j (so reversing a route segment stays allowed).
+    Arcs from and to the depot are always candidates, so routes can start and end anywhere.
+
+    Args:
+        matrix: N×N cost matrix.
+        k (int): Number of nearest neighbors kept per node.
+        depot (int): Index of the depot node.
+
+    Returns:
+        numpy.ndarray: N×N boolean mask of candidate arcs.
+    """
+    cost = np.array(matrix, dtype=np.float64)
+    n = len(cost)
+    candidates = np.ones((n, n), dtype=bool)
+    k = min(k, n - 1)
+    if k < 1 or k >= n - 1:
+        return candidates
+
+    np.fill_diagonal(cost, np.inf)
+    nearest = np.argpartition(cost, k - 1, axis=1)[:, :k]
+
+    candidates[:] = False
+    candidates[np.repeat(np.arange(n), k), nearest.ravel()] = True
+    candidates |= candidates.T
+    candidates[depot, :] = True
+    candidates[:, depot] = True
+    np.fill_diagonal(candidates, True)
+    return candidates
+
+def penalize_non_candidates(matrix, candidates, penalty=None):
+    """Returns a cost matrix where non-candidate arcs cost an extra penalty (default: the largest arc cost)."""
+    matrix = np.asarray(matrix, dtype=np.int64)
+    if penalty is None:
+        penalty = int(matrix.max())
+    return np.where(candidates, matrix, matrix + penalty)
+
+def forbid_non_candidates(routing, manager, candidates, depot=0):
+    """Removes non-candidate successors from each customer's NextVar, shrinking the search space."""
+    n = len(candidates)
+    for i in range(n):
+        if i == depot:
+            continue
+        forbidden = [manager.NodeToIndex(j) for j in np.flatnonzero(~candidates[i]).tolist()]
+        if forbidden:
+            routing.NextVar(manager.NodeToIndex(i)).RemoveValues(forbidden)
@@ -0,0 +1,100 @@
+import json
+
+# Characters read per chunk; only the chunk and the order being parsed are held in memory
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+def _skip(buffer, pos, characters):
+    while pos < len(buffer) and buffer[pos] in characters:
+        pos += 1
+    return pos
+
+
+def _iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array one at a time."""
+    buffer = f.read(chunk_size)
+    pos = _skip(buffer, 0, " \t\r\n")
+    if buffer[pos:pos + 1] != "[":
+        raise ValueError("Order feed must be a JSON array or JSON lines")
+    pos += 1
+    eof = False
+
+    while True:
+        pos = _skip(buffer, pos, " \t\r\n,")
+        if buffer[pos:pos + 1] == "]":
+            return
+        try:
+            element, pos = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The element continues in the next chunk
+            if eof:
+                raise ValueError("Order feed ends inside an unterminated JSON array")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield element
+
+
+def _iter_json_lines(f):
+    """Yield one JSON value per non-empty line."""
+    for line_number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number} of the order feed: {e}") from e
+
+
+def iter_orders(path, chunk_size=CHUNK_SIZE):
+    """Stream orders from a JSON array file or a JSON lines (.jsonl/.ndjson) file.
+
+    Orders are parsed incrementally and yielded one at a time, so peak memory is
+    bounded by one chunk plus one order, whatever the size of the file.
+
+    Args:
+        path (str): Path of the order feed.
+        chunk_size (int): Characters read at a time from a JSON array file.
+
+    Yields:
+        dict: Orders with order_id, destination and items.
+    """
+    with open(path, 'r') as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            yield from _iter_json_lines(f)
+        else:
+            yield from _iter_json_array(f, chunk_size)
+
+
+def is_open(order):
+    """An order is open until all of its items are fulfilled."""
+    return not all(item['fullfilled'] for item in order['items'])
+
+
+def iter_open_orders(orders):
+    """Filter a stream of orders down to the open ones, lazily."""
+    return (order for order in orders if is_open(order))
+
+
+def iter_stops(orders):
+    """(order_id, destination, total quantity) of every open order in a stream, lazily."""
+    for order in iter_open_orders(orders):
+        yield order['order_id'], order['destination'], sum(item['quantity'] for item in order['items'])
+
+
+def iter_unfulfilled_items(orders):
+    """Unfulfilled items with a positive quantity of a stream of orders, lazily."""
+    for order in iter_open_orders(orders):
+        for item in order['items']:
+            if not item['fullfilled'] and item['quantity'] > 0:
+                yield {
+                    'order_id': order['order_id'],
+                    'destination': order['destination'],
+                    'product_id': item['product_id'],
+                    'quantity': item['quantity'],
+                }
@@ -0,0 +1,135 @@
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from helper.optimize_by import get_optimize_by
+from helper.routes import get_routes
+from helper.solver import build_routing_model, get_search_parameters, restore_solution
+
+# (first solution strategy, local search metaheuristic) pairs raced by solve_portfolio
+DEFAULT_PORTFOLIO = [
+    ("PATH_CHEAPEST_ARC", "GUIDED_LOCAL_SEARCH"),
+    ("SAVINGS", "GUIDED_LOCAL_SEARCH"),
+    ("PARALLEL_CHEAPEST_INSERTION", "GUIDED_LOCAL_SEARCH"),
+    ("PATH_CHEAPEST_ARC", "TABU_SEARCH"),
+    ("CHRISTOFIDES", "SIMULATED_ANNEALING"),
+    ("LOCAL_CHEAPEST_INSERTION", "GUIDED_LOCAL_SEARCH"),
+]
+
+# Every portfolio run is appended here so defaults can be tuned from production data
+PORTFOLIO_LOG = os.getenv("PORTFOLIO_LOG", "portfolio_runs.jsonl")
+
+# Seconds reserved for process start-up and model building inside the wall-clock budget
+STARTUP_MARGIN = 1
+
+
+def share_matrices(*matrices):
+    """Copies equally shaped matrices into one shared memory block.
+
+    Returns:
+        tuple: (shm, spec) where spec can be passed to worker processes and
+               opened with attach_matrices; the caller must close and unlink shm.
+    """
+    stacked = np.stack([np.asarray(matrix, dtype=np.int32) for matrix in matrices])
+    shm = shared_memory.SharedMemory(create=True, size=stacked.nbytes)
+    np.ndarray(stacked.shape, dtype=np.int32, buffer=shm.buf)[:] = stacked
+    return shm, (shm.name, stacked.shape)
+
+
+def attach_matrices(spec):
+    """Opens matrices shared with share_matrices from a worker process, without copying them.
+
+    Returns:
+        tuple: (shm, matrices); close shm once the matrices are no longer used.
+    """
+    name, shape = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.int32, buffer=shm.buf)
+
+
+def _solve_config(spec, demands, vehicle_capacities, num_vehicles, depot, optimize_by, time_limit, config):
+    """Worker: solves the shared instance with one (first solution, metaheuristic) configuration."""
+    started = time.monotonic()
+    shm, (distance_matrix, duration_matrix) = attach_matrices(spec)
+    try:
+        manager, routing = build_routing_model(
+            distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot, optimize_by
+        )
+    finally:
+        del distance_matrix, duration_matrix
+        shm.close()
+
+    solution = routing.SolveWithParameters(get_search_parameters(time_limit, *config))
+    return {
+        "first_solution_strategy": config[0],
+        "local_search_metaheuristic": config[1],
+        "objective": solution.ObjectiveValue() if solution else None,
+        "routes": get_routes(solution, routing, manager) if solution else None,
+        "seconds": round(time.monotonic() - started, 2),
+    }
+
+
+def _log_run(record):
+    with open(PORTFOLIO_LOG, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def solve_portfolio(distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot,
+                    optimize_by=None, time_limit=10, configs=None, max_workers=None):
+    """Races several search configurations on the same instance in a process pool and keeps the best plan.
+
+    The matrices are placed in shared memory once, so workers read them without pickled copies.
+    Only as many configurations as workers are raced, each with the wall-clock budget minus
+    STARTUP_MARGIN.
+
+    Returns:
+        tuple: (manager, routing, solution, report) where report records the winning
+               configuration and the objective of every configuration.
+    """
+    optimize_by = optimize_by or get_optimize_by()
+    max_workers = max_workers or os.cpu_count() or 1
+    # One process per configuration; queued configurations would overrun the wall-clock budget
+    configs = (configs or DEFAULT_PORTFOLIO)[:max_workers]
+    worker_time_limit = max(1, time_limit - STARTUP_MARGIN)
+
+    shm, spec = share_matrices(distance_matrix, duration_matrix)
+    try:
+        # Spawned, not forked, like helper.solver_pool: the app's sqlite connections and threads must not leak in
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(_solve_config, spec, demands, vehicle_capacities, num_vehicles, depot,
+                                optimize_by, worker_time_limit, config)
+                for config in configs
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    solved = [result for result in results if result["objective"] is not None]
+    best = min(solved, key=lambda result: result["objective"]) if solved else None
+
+    report = {
+        "timestamp": time.time(),
+        "num_nodes": len(distance_matrix),
+        "num_vehicles": num_vehicles,
+        "optimize_by": optimize_by,
+        "time_limit": time_limit,
+        "winner": {key: best[key] for key in ("first_solution_strategy", "local_search_metaheuristic", "objective")} if best else None,
+        "results": [{key: value for key, value in result.items() if key != "routes"} for result in results],
+    }
+    _log_run(report)
+
+    if best is None:
+        print("❌ No configuration in the portfolio found a solution")
+        return None, None, None, report
+
+    print(f"🏁 Portfolio winner: {best['first_solution_strategy']} + {best['local_search_metaheuristic']} "
+          f"(objective {best['objective']})")
+    manager, routing, solution = restore_solution(
+        best["routes"], distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot, optimize_by
+    )
+    return manager, routing, solution, report
@@ -0,0 +1,81 @@
+import re
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20,
+}
+# Whole words only: "a" must not match the start of "at" or "about", nor "eight" of "eighty"
+_NUMBER = r"(\d+|" + "|".join(NUMBER_WORDS) + r")\b"
+_VEHICLE = r"(?:vehicles?|trucks?|vans?|drivers?|cars?)"
+
+# "3 vehicles", "three trucks"
+_VEHICLES_PATTERN = re.compile(rf"\b{_NUMBER}\s+(?:\w+\s+)?{_VEHICLE}\b")
+# "vehicles: 3"
+_VEHICLES_AFTER_PATTERN = re.compile(rf"\b{_VEHICLE}\s*(?:[:=]|count\s*(?:of|:)?)\s*{_NUMBER}\b")
+# "capacity 5", "capacity of 5", "can carry 5 items", "5 items each", "capacities 5, 5 and 10",
+# "carry at most 10", "holds up to 8"; approximate amounts ("about 10") are left to the agent.
+# A number after "," or "and" that counts vehicles ("capacity 100 and 1 van") is not a capacity
+_CAPACITY_PATTERN = re.compile(
+    rf"\b(?:capacit(?:y|ies)(?:\s+of)?|carry|holds?|load(?:\s+of)?)\s*[:=]?\s*"
+    rf"(?:(?:at\s+most|up\s+to|a\s+maximum\s+of|max(?:imum)?(?:\s+of)?)\s+)?{_NUMBER}"
+    rf"((?:\s*(?:,|and)\s*\d+\b(?!\s+(?:\w+\s+)?{_VEHICLE}\b))*)"
+)
+_CAPACITY_EACH_PATTERN = re.compile(rf"\b{_NUMBER}\s+(?:items?|units?|packages?|parcels?|boxes)\s+(?:each|per\s+{_VEHICLE})")
+_DRAFT_PATTERN = re.compile(r"\b(?:draft|rough|quick estimate|estimate only)\b")
+# "depot 0", "depot at stop 2", "start from index 1"
+_DEPOT_PATTERN = re.compile(r"\b(?:depot|start(?:ing)?\s+(?:from|at))\s*(?:is\s+|at\s+)?(?:stop|index|node|address)?\s*[:=#]?\s*(\d+)\b")
+
+
+def _to_int(token):
+    return int(token) if token.isdigit() else NUMBER_WORDS[token]
+
+
+def parse_vrp_query(query):
+    """Extract the fleet from common plain-language VRP queries without calling a model.
+
+    Handles phrasings such as "3 vehicles, each can carry 5 items", "two trucks with
+    capacity 10", "vehicles: 4, capacities 5, 5, 8 and 10" or "depot at stop 2".
+    "can carry at most 10 items" and "holds up to 8" are read as capacities. Mixed
+    fleets such as "2 trucks of capacity 100 and 1 van of capacity 50" state more
+    than one vehicle count, and approximate capacities such as "about 10 boxes"
+    have no exact value, so both are left to the agent.
+
+    Returns:
+        dict: num_vehicles, vehicle_capacity (one int per vehicle), depot and draft, or None
+              when the query does not state exactly one vehicle count and a capacity,
+              in which case the caller should fall back to the agent.
+    """
+    text = query.lower()
+
+    counts = {match.span(1): match for match in _VEHICLES_PATTERN.finditer(text)}
+    counts.update({match.span(1): match for match in _VEHICLES_AFTER_PATTERN.finditer(text)})
+    if len(counts) != 1:
+        return None
+    num_vehicles = _to_int(next(iter(counts.values())).group(1))
+
+    capacities = None
+    match = _CAPACITY_PATTERN.search(text)
+    if match:
+        capacities = [_to_int(match.group(1))] + [int(value) for value in re.findall(r"\d+", match.group(2))]
+    else:
+        match = _CAPACITY_EACH_PATTERN.search(text)
+        if match:
+            capacities = [_to_int(match.group(1))]
+    if not capacities or num_vehicles < 1:
+        return None
+
+    if len(capacities) == 1:
+        capacities = capacities * num_vehicles
+    elif len(capacities) != num_vehicles:
+        # A capacity list that doesn't match the fleet is ambiguous
+        return None
+
+    match = _DEPOT_PATTERN.search(text)
+    depot = int(match.group(1)) if match else 0
+
+    return {
+        "num_vehicles": num_vehicles,
+        "vehicle_capacity": capacities,
+        "depot": depot,
+        "draft": bool(_DRAFT_PATTERN.search(text)),
+    }
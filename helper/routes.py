@@ -11,3 +11,22 @@ def get_routes(solution, routing, manager):
             route.append(manager.IndexToNode(index))
         routes.append(route)
     return routes
+
+# Function to get the cost of routes
+def routes_cost(routes, matrix):
+    """Total cost of routes (node indices) on a cost matrix, e.g. the real distance of a
+    plan searched on penalized arc costs (see helper.neighbors)."""
+    return int(sum(matrix[a][b] for route in routes for a, b in zip(route, route[1:])))
+
+# Function to get routes while the search is running
+def current_routes(routing, manager):
+    """Get vehicle routes of the solution being visited, from inside a search callback."""
+    routes = []
+    for route_nbr in range(routing.vehicles()):
+        index = routing.Start(route_nbr)
+        route = [manager.IndexToNode(index)]
+        while not routing.IsEnd(index):
+            index = routing.NextVar(index).Value()
+            route.append(manager.IndexToNode(index))
+        routes.append(route)
+    return routes
@@ -0,0 +1,70 @@
+import math
+import numpy as np
+
+# Ground resolution of a 256px Web Mercator tile at zoom 0, in meters per pixel at the equator
+METERS_PER_PIXEL_Z0 = 156543.03392
+
+def douglas_peucker(points, tolerance):
+    """Douglas–Peucker line simplification on planar points.
+
+    Args:
+        points: (N, 2) array of planar coordinates.
+        tolerance (float): Maximum allowed deviation, in the same units as points.
+
+    Returns:
+        numpy.ndarray: Boolean mask of the points to keep (endpoints always kept).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        # Perpendicular distance of every interior point to the start-end chord, vectorized
+        a, b = points[start], points[end]
+        interior = points[start + 1:end] - a
+        chord = b - a
+        chord_length = math.hypot(*chord)
+        if chord_length == 0:
+            distances = np.hypot(interior[:, 0], interior[:, 1])
+        else:
+            distances = np.abs(chord[0] * interior[:, 1] - chord[1] * interior[:, 0]) / chord_length
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return keep
+
+def tolerance_for_zoom(zoom, latitude, pixels=1.0):
+    """Ground distance in meters covered by `pixels` screen pixels at a Web Mercator zoom level."""
+    return pixels * METERS_PER_PIXEL_Z0 * math.cos(math.radians(latitude)) / (2 ** zoom)
+
+def simplify_path(path, zoom, pixels=1.0):
+    """Simplifies a (lat, lon) path so it deviates by at most `pixels` on screen at `zoom`.
+
+    Returns:
+        list: The kept (lat, lon) tuples, in order.
+    """
+    if len(path) < 3:
+        return list(path)
+
+    coords = np.asarray(path, dtype=np.float64)
+    lat0 = float(coords[:, 0].mean())
+    # Local equirectangular projection to meters, accurate enough at city scale
+    planar = np.column_stack((
+        coords[:, 1] * 111_320 * math.cos(math.radians(lat0)),
+        coords[:, 0] * 110_540,
+    ))
+    keep = douglas_peucker(planar, tolerance_for_zoom(zoom, lat0, pixels))
+    return [tuple(point) for point in coords[keep].tolist()]
@@ -1,6 +1,18 @@
+# Function to list the orders served at a stop
+def _orders_label(order_ids, node_index):
+    if not order_ids or not order_ids[node_index]:
+        return ""
+    return f" (orders: {', '.join(order_ids[node_index])})"
+
 # Function for printing the solution of the VRP
-def print_solution(manager, routing, solution, addresses):
-    """Prints the solution routes for all vehicles with addresses and distances."""
+def print_solution(manager, routing, solution, addresses, order_ids=None, distance_matrix=None):
+    """Prints the solution routes for all vehicles with addresses and distances.
+
+    order_ids optionally lists the orders served at each stop, for consolidated stops.
+    Distances are read from distance_matrix when given; otherwise they are the model's
+    arc costs, which are durations when optimizing by time and include the penalties
+    of granular neighborhoods.
+    """
     total_distance = 0
     plan_output = "\n🚗 Optimized Routes:\n"
     
@@ -12,10 +24,13 @@ def print_solution(manager, routing, solution, addresses):
         
         while not routing.IsEnd(index):
             node_index = manager.IndexToNode(index)
-            route_output += f"{step}. {addresses[node_index]}\n"
+            route_output += f"{step}. {addresses[node_index]}{_orders_label(order_ids, node_index)}\n"
             previous_index = index
             index = solution.Value(routing.NextVar(index))
-            route_distance += routing.GetArcCostForVehicle(previous_index, index, vehicle_id)
+            if distance_matrix is not None:
+                route_distance += int(distance_matrix[node_index][manager.IndexToNode(index)])
+            else:
+                route_distance += routing.GetArcCostForVehicle(previous_index, index, vehicle_id)
             step += 1
             
         node_index = manager.IndexToNode(index)
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from helper.matrix_cache import coord_key
+
+SOLVE_CACHE_DB = os.getenv("SOLVE_CACHE_DB", "solve_cache.db")
+SOLVE_CACHE_MAX_ENTRIES = int(os.getenv("SOLVE_CACHE_MAX_ENTRIES", 500))  # on disk, least recently used evicted
+SOLVE_CACHE_MEMORY_ENTRIES = int(os.getenv("SOLVE_CACHE_MEMORY_ENTRIES", 32))
+
+# Connect to the cache database (or create if not exists)
+conn = sqlite3.connect(SOLVE_CACHE_DB, check_same_thread=False)
+lock = threading.Lock()
+
+conn.execute('''
+    CREATE TABLE IF NOT EXISTS solutions (
+        key TEXT PRIMARY KEY,
+        result TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    )
+''')
+conn.execute("CREATE INDEX IF NOT EXISTS idx_solutions_last_used ON solutions (last_used)")
+conn.commit()
+
+# In-process LRU layer in front of sqlite, most recently used last
+_memory = OrderedDict()
+
+
+def fingerprint(coordinates, demands, vehicle_capacities, num_vehicles, depot, optimize_by, **solver_parameters):
+    """Content hash of a routing instance and everything that changes its solution.
+
+    Coordinates are rounded like the matrix cache, so re-geocoded stops still match.
+    Pass anything else that affects the result (time limit, draft mode, solver) or
+    appears in it (order IDs, addresses) as keyword arguments.
+    """
+    payload = {
+        "coordinates": [coord_key(coord) for coord in coordinates],
+        "demands": demands,
+        "vehicle_capacities": vehicle_capacities,
+        "num_vehicles": num_vehicles,
+        "depot": depot,
+        "optimize_by": optimize_by,
+        "solver": solver_parameters,
+    }
+    # default=int handles NumPy integers
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=int).encode()).hexdigest()
+
+
+def _remember(key, result):
+    _memory[key] = result
+    _memory.move_to_end(key)
+    while len(_memory) > SOLVE_CACHE_MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def lookup(key):
+    """Return the cached result dict for a fingerprint, or None, and report the hit or miss."""
+    with lock:
+        result = _memory.get(key)
+        if result is not None:
+            _memory.move_to_end(key)
+        else:
+            row = conn.execute("SELECT result FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                result = json.loads(row[0])
+                _remember(key, result)
+        if result is not None:
+            conn.execute("UPDATE solutions SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+
+    print(f"⚡ Solve cache hit ({key[:12]})" if result is not None else f"🔍 Solve cache miss ({key[:12]})")
+    return result
+
+
+def store(key, result):
+    """Cache a JSON-serializable result dict, evicting the least recently used entries beyond the limit."""
+    now = time.time()
+    serialized = json.dumps(result, default=int)
+    with lock:
+        conn.execute(
+            "INSERT OR REPLACE INTO solutions (key, result, created_at, last_used) VALUES (?, ?, ?, ?)",
+            (key, serialized, now, now),
+        )
+        conn.execute(
+            "DELETE FROM solutions WHERE key NOT IN (SELECT key FROM solutions ORDER BY last_used DESC LIMIT ?)",
+            (SOLVE_CACHE_MAX_ENTRIES,),
+        )
+        conn.commit()
+        # Keep the decoded form, so memory and disk hits look the same
+        _remember(key, json.loads(serialized))
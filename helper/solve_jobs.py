@@ -0,0 +1,359 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from multiprocessing.connection import wait
+
+# Solves running at once; later jobs wait in submission order
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", os.cpu_count() or 1))
+# Seconds a cancelled job gets to end its search cleanly before its process is terminated
+JOB_CANCEL_GRACE = float(os.getenv("JOB_CANCEL_GRACE", 3))
+# Finished jobs kept for polling, oldest dropped first
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", 200))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Workers are spawned, not forked: the app's sqlite connections and threads must not leak into them
+_context = multiprocessing.get_context("spawn")
+
+_jobs = OrderedDict()  # job_id -> job dict, in submission order
+_processes = {}  # job_id -> (process, cancel event, stop event, message pipe) of running jobs
+_inflight = {}  # dedupe key -> job_id of queued and running jobs
+_pending = deque()
+_monitor = None
+lock = threading.Lock()
+
+
+def _job_key(kind, params):
+    """Identical requests share a key, so they can share one job while it is in flight."""
+    payload = json.dumps({"kind": kind, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Function to run one job in a worker process
+def _run_job(kind, params, messages, cancel, stop):
+    """Worker: runs a solve and streams its progress back as (event, value) messages.
+
+    messages is the sending end of the job's own pipe, so a worker terminated
+    mid-message can only garble its own job's messages. Setting cancel ends the
+    search at once; setting stop ends it once there is a plan to keep.
+    """
+    from route_optimization import plan_vrp, solve_tsp
+
+    found = [False]
+    searching = [False]
+    stopped = [False]
+    last_poll = [0.0]
+
+    def on_solution(solution):
+        # Improving solutions only, see route_optimization.solve_vrp
+        found[0] = True
+        messages.send(("solution", solution))
+
+    def should_stop():
+        # First polled when the search, and with it the OR-Tools time limit, starts
+        if not searching[0]:
+            searching[0] = True
+            messages.send(("stage", "searching"))
+        # Polled at every search node, so the events are only checked a few times per second
+        now = time.monotonic()
+        if not stopped[0] and now - last_poll[0] >= 0.1:
+            last_poll[0] = now
+            stopped[0] = cancel.is_set() or (found[0] and stop.is_set())
+        return stopped[0]
+
+    try:
+        messages.send(("stage", "preparing"))
+        if kind == "vrp":
+            result = plan_vrp(**params, on_solution=on_solution, should_stop=should_stop)
+            if not isinstance(result, dict):
+                raise ValueError(result)
+        else:
+            report = {}
+            output, routes, coordinates, addresses, demands = solve_tsp(
+                **params, report=report, on_solution=on_solution, should_stop=should_stop
+            )
+            result = {
+                "plan_output": output,
+                "routes": routes,
+                "coordinates": coordinates,
+                "addresses": addresses,
+                "demands": demands,
+                "cache": report.get("cache"),
+            }
+        messages.send(("done", result))
+    except Exception as e:
+        messages.send(("error", str(e)))
+    finally:
+        messages.close()
+
+
+def _apply(job_id, event, value):
+    job = _jobs.get(job_id)
+    if job is None or job["status"] in FINISHED:
+        return
+    if event == "stage":
+        job["stage"] = value
+        if value == "searching":
+            job["search_started_at"] = time.time()
+    elif event == "solution":
+        # The first solution also carries the stops its routes index into
+        for name in ("coordinates", "addresses", "demands"):
+            if name in value:
+                job["stops"][name] = value.pop(name)
+        job["best"] = value
+        job["history"].append((value["elapsed_seconds"], value["objective"]))
+        job["objective"] = value["objective"]
+        job["solutions"] += 1
+    elif event == "done":
+        if job["cancel_requested"]:
+            _finish(job_id, CANCELLED)
+        else:
+            job["result"] = value
+            _finish(job_id, DONE)
+    elif event == "error":
+        job["error"] = value
+        _finish(job_id, CANCELLED if job["cancel_requested"] else FAILED)
+
+
+def _finish(job_id, status):
+    job = _jobs[job_id]
+    job["status"] = status
+    job["stage"] = status
+    job["finished_at"] = time.time()
+    _inflight.pop(job["key"], None)
+
+    # Forget the oldest finished jobs beyond the history limit
+    finished = [other for other, other_job in _jobs.items() if other_job["status"] in FINISHED]
+    for other in finished[:max(0, len(finished) - JOB_HISTORY)]:
+        del _jobs[other]
+
+
+def _start_pending():
+    while _pending and len(_processes) < JOB_WORKERS:
+        job_id = _pending.popleft()
+        job = _jobs[job_id]
+        cancel, stop = _context.Event(), _context.Event()
+        receiver, sender = _context.Pipe(duplex=False)
+        process = _context.Process(
+            target=_run_job, args=(job["kind"], job["params"], sender, cancel, stop), daemon=True
+        )
+        process.start()
+        # Only the worker writes, so the pipe reports end-of-file once the worker is gone
+        sender.close()
+        _processes[job_id] = (process, cancel, stop, receiver)
+        job["status"] = RUNNING
+        job["stage"] = "starting"
+        job["started_at"] = time.time()
+        print(f"🚚 Job {job_id} started ({job['kind']})")
+
+
+def _receive(job_id, receiver):
+    """Applies the messages waiting in a job's pipe.
+
+    A pipe that is closed, or garbled by a worker terminated mid-message, ends the
+    job's messages; _check_processes then settles the job when its worker is gone.
+    """
+    try:
+        while receiver.poll():
+            _apply(job_id, *receiver.recv())
+    except (EOFError, OSError, pickle.UnpicklingError):
+        pass
+
+
+def _check_processes():
+    for job_id, (process, _, _, receiver) in list(_processes.items()):
+        job = _jobs.get(job_id)
+        if process.is_alive():
+            # Cancelled jobs that don't stop in time (e.g. still geocoding) are terminated
+            if job["cancel_requested"] and time.time() - job["cancel_requested"] > JOB_CANCEL_GRACE:
+                print(f"🛑 Terminating job {job_id}")
+                process.terminate()
+            continue
+
+        process.join()
+        # A worker's last messages are read before its job is settled, then its pipe is dropped
+        _receive(job_id, receiver)
+        receiver.close()
+        del _processes[job_id]
+        if job is not None and job["status"] not in FINISHED:
+            if job["cancel_requested"]:
+                _finish(job_id, CANCELLED)
+            else:
+                job["error"] = f"Worker exited with code {process.exitcode}"
+                _finish(job_id, FAILED)
+
+
+def _run_monitor():
+    """Background thread: applies worker messages, reaps workers and starts queued jobs."""
+    while True:
+        with lock:
+            receivers = {entry[3]: job_id for job_id, entry in _processes.items()}
+        # Only this thread removes jobs from _processes, so the pipes stay open while waiting
+        if receivers:
+            ready = wait(list(receivers), timeout=0.2)
+        else:
+            ready = []
+            time.sleep(0.2)
+
+        with lock:
+            for receiver in ready:
+                _receive(receivers[receiver], receiver)
+            _check_processes()
+            _start_pending()
+
+
+def _ensure_monitor():
+    global _monitor
+    if _monitor is None:
+        _monitor = threading.Thread(target=_run_monitor, name="solve-jobs", daemon=True)
+        _monitor.start()
+
+
+def submit(kind, **params):
+    """Queue a solve and return its job ID.
+
+    A request identical to one that is still queued or running returns that job's ID
+    instead of starting another solve.
+
+    Args:
+        kind (str): "vrp" (params as route_optimization.plan_vrp, including optimize_by,
+            which worker processes don't inherit) or "tsp" (params as solve_tsp).
+        **params: JSON-serializable keyword arguments of the solve.
+
+    Returns:
+        str: The job ID, to poll with get_status.
+    """
+    if kind not in ("vrp", "tsp"):
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    key = _job_key(kind, params)
+    with lock:
+        _ensure_monitor()
+        if key in _inflight:
+            print(f"🔁 Job {_inflight[key]} is already solving this request")
+            return _inflight[key]
+
+        job_id = uuid.uuid4().hex[:12]
+        _jobs[job_id] = {
+            "id": job_id,
+            "kind": kind,
+            "params": params,
+            "key": key,
+            "status": QUEUED,
+            "stage": QUEUED,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "search_started_at": None,
+            "finished_at": None,
+            "cancel_requested": None,
+            "stop_requested": None,
+            "objective": None,
+            "solutions": 0,
+            "best": None,
+            "stops": {},
+            "history": [],
+            "result": None,
+            "error": None,
+        }
+        _inflight[key] = job_id
+        _pending.append(job_id)
+        _start_pending()
+    return job_id
+
+
+def get_status(job_id):
+    """Progress of a job, or None for an unknown (or long forgotten) job ID.
+
+    Returns:
+        dict: status (queued, running, done, failed or cancelled), stage, position in
+              the queue, best objective so far, improving solutions found, elapsed
+              seconds, eta_seconds (the rest of the search time limit once the search
+              has started, otherwise None), error and, when done, the result.
+              best is the best plan so far (objective, routes, elapsed_seconds,
+              coordinates, addresses and demands) or None, and history lists the
+              (elapsed_seconds, objective) of every improvement.
+    """
+    with lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        now = job["finished_at"] or time.time()
+
+        eta = None
+        time_limit = job["params"].get("time_limit", 10) if job["kind"] == "vrp" else None
+        if job["status"] == RUNNING and job["search_started_at"] and time_limit:
+            eta = max(0.0, job["search_started_at"] + time_limit - now)
+        elif job["status"] in FINISHED:
+            eta = 0.0
+
+        return {
+            "id": job_id,
+            "kind": job["kind"],
+            "status": job["status"],
+            "stage": job["stage"],
+            "queue_position": _pending.index(job_id) + 1 if job["status"] == QUEUED else None,
+            "objective": job["objective"],
+            "solutions": job["solutions"],
+            "elapsed_seconds": round(now - (job["started_at"] or job["submitted_at"]), 1),
+            "eta_seconds": None if eta is None else round(eta, 1),
+            "cancel_requested": job["cancel_requested"] is not None,
+            "stop_requested": job["stop_requested"] is not None,
+            "best": {**job["best"], **job["stops"]} if job["best"] else None,
+            "history": list(job["history"]),
+            "error": job["error"],
+            "result": job["result"],
+        }
+
+
+def cancel(job_id):
+    """Cancel a queued or running job.
+
+    A queued job is dropped. A running search is asked to stop; its process is
+    terminated if it hasn't finished JOB_CANCEL_GRACE seconds later.
+
+    Returns:
+        bool: False if the job is unknown or already finished.
+    """
+    with lock:
+        job = _jobs.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return False
+        job["cancel_requested"] = time.time()
+        if job["status"] == QUEUED:
+            _pending.remove(job_id)
+            _finish(job_id, CANCELLED)
+        else:
+            _processes[job_id][1].set()
+    print(f"🛑 Cancel requested for job {job_id}")
+    return True
+
+
+def stop(job_id):
+    """End a running search early and keep its best plan so far.
+
+    The job finishes as done with that plan; if no plan has been found yet, the
+    search ends at the first one. A queued job is cancelled instead.
+
+    Returns:
+        bool: False if the job is unknown or already finished.
+    """
+    with lock:
+        job = _jobs.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return False
+        if job["status"] == QUEUED:
+            job["cancel_requested"] = time.time()
+            _pending.remove(job_id)
+            _finish(job_id, CANCELLED)
+        else:
+            job["stop_requested"] = time.time()
+            _processes[job_id][2].set()
+    print(f"⏹️ Stop requested for job {job_id}")
+    return True
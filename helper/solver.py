@@ -0,0 +1,171 @@
+from ortools.constraint_solver import routing_enums_pb2
+from ortools.constraint_solver import pywrapcp
+import numpy as np
+from helper.optimize_by import get_optimize_by
+from helper.neighbors import knn_candidates, penalize_non_candidates, forbid_non_candidates
+from helper.routes import current_routes
+
+def get_search_parameters(time_limit=10, first_solution_strategy="PATH_CHEAPEST_ARC", local_search_metaheuristic="GUIDED_LOCAL_SEARCH"):
+    """Build OR-Tools search parameters from strategy names.
+
+    Args:
+        time_limit (float): Search time limit in seconds (fractions kept to the millisecond), or None for no limit.
+        first_solution_strategy (str): Name of a routing_enums_pb2.FirstSolutionStrategy value.
+        local_search_metaheuristic (str): Name of a routing_enums_pb2.LocalSearchMetaheuristic value, or None.
+    """
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = getattr(routing_enums_pb2.FirstSolutionStrategy, first_solution_strategy)
+    if local_search_metaheuristic:
+        search_parameters.local_search_metaheuristic = getattr(routing_enums_pb2.LocalSearchMetaheuristic, local_search_metaheuristic)
+    if time_limit:
+        search_parameters.time_limit.FromMilliseconds(int(time_limit * 1000))
+    return search_parameters
+
+def build_routing_model(distance_matrix, duration_matrix=None, demands=None, vehicle_capacities=None,
+                        num_vehicles=1, depot=0, optimize_by="Distance", candidate_k=None, candidate_mode="penalize"):
+    """Builds a RoutingModel whose arc costs and dimensions are read from integer matrices.
+
+    The matrices are registered with RegisterTransitMatrix/RegisterUnaryTransitVector,
+    so arc evaluations during the search stay in C++ instead of calling back into Python.
+
+    Args:
+        distance_matrix: N×N integer matrix (NumPy array or nested lists) in meters.
+        duration_matrix: Optional N×N integer matrix in seconds; adds a "Time" dimension.
+        demands (list): Optional demand per node; requires vehicle_capacities.
+        vehicle_capacities (list): Capacity per vehicle for the "Capacity" dimension.
+        num_vehicles (int): Number of vehicles.
+        depot (int): Index of the depot node.
+        optimize_by (str): "Distance" or "Time", the arc cost to minimize.
+        candidate_k (int): If set, restrict the search to arcs between k-nearest neighbors
+            (see helper.neighbors), which speeds up large instances.
+        candidate_mode (str): "penalize" keeps non-candidate arcs at an extra cost;
+            "forbid" removes them from the model, which shrinks the search further but
+            can leave no feasible first solution when k is small for the fleet size.
+
+    Returns:
+        tuple: (manager, routing)
+    """
+    distance_matrix = np.asarray(distance_matrix, dtype=np.int64)
+
+    # Create the routing index manager
+    manager = pywrapcp.RoutingIndexManager(len(distance_matrix), num_vehicles, depot)
+
+    # Create Routing Model
+    routing = pywrapcp.RoutingModel(manager)
+
+    # Register the matrices as transits
+    distance_callback_index = routing.RegisterTransitMatrix(distance_matrix.tolist())
+    cost_callback_index = distance_callback_index
+
+    if duration_matrix is not None:
+        duration_matrix = np.asarray(duration_matrix, dtype=np.int64)
+        duration_callback_index = routing.RegisterTransitMatrix(duration_matrix.tolist())
+        if optimize_by != 'Distance':
+            cost_callback_index = duration_callback_index
+
+        # Add Time Window constraint (using duration)
+        routing.AddDimension(
+            duration_callback_index,
+            0,  # no slack
+            86400,  # 24 hours max, adjust as needed
+            False,  # don't force start to zero.
+            "Time"
+        )
+
+    # Granular neighborhoods: only arcs between nearby nodes are worth exploring
+    candidates = None
+    if candidate_k:
+        cost_matrix = distance_matrix if optimize_by == 'Distance' or duration_matrix is None else duration_matrix
+        candidates = knn_candidates(cost_matrix, candidate_k, depot)
+        if candidate_mode == "penalize":
+            cost_callback_index = routing.RegisterTransitMatrix(penalize_non_candidates(cost_matrix, candidates).tolist())
+
+    # Define cost of each arc based on optimization preference
+    routing.SetArcCostEvaluatorOfAllVehicles(cost_callback_index)
+
+    if candidates is not None and candidate_mode == "forbid":
+        forbid_non_candidates(routing, manager, candidates, depot)
+
+    # Add Capacity constraint
+    if demands is not None:
+        demand_callback_index = routing.RegisterUnaryTransitVector([int(demand) for demand in demands])
+        routing.AddDimensionWithVehicleCapacity(
+            demand_callback_index,
+            0,  # no slack
+            [int(capacity) for capacity in vehicle_capacities],  # vehicle maximum capacities
+            True,  # start cumul to zero
+            "Capacity")
+
+    return manager, routing
+
+def add_search_callbacks(routing, manager, on_solution=None, should_stop=None, target_objective=None):
+    """Hooks Python callbacks into the search of a RoutingModel, before it is solved.
+
+    Args:
+        on_solution: Called as on_solution(objective, routes) at every improving solution,
+            so callers can show the plan while the search refines it.
+        should_stop: Polled throughout the search (as a CustomLimit); once it returns
+            True the search ends and the best solution found so far is returned.
+        target_objective (int): "Good enough" cost; the search ends at the first
+            solution that reaches it, saving the rest of the time limit.
+    """
+    best = [None]
+    reached = [False]
+
+    def at_solution():
+        objective = routing.CostVar().Value()
+        if best[0] is not None and objective >= best[0]:
+            return
+        best[0] = objective
+        reached[0] = target_objective is not None and objective <= target_objective
+        if on_solution is not None:
+            on_solution(objective, current_routes(routing, manager))
+
+    if on_solution is not None or target_objective is not None:
+        routing.AddAtSolutionCallback(at_solution)
+    if should_stop is not None or target_objective is not None:
+        routing.AddSearchMonitor(routing.solver().CustomLimit(
+            lambda: reached[0] or (should_stop is not None and should_stop())
+        ))
+
+def solve_routing(distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot,
+                  optimize_by=None, search_parameters=None, candidate_k=None, candidate_mode="penalize",
+                  on_solution=None, should_stop=None, target_objective=None):
+    """Solves a capacitated VRP on precomputed matrices.
+
+    candidate_k/candidate_mode restrict the search to k-nearest-neighbor arcs (see build_routing_model),
+    on_solution/should_stop/target_objective report progress and end the search early (see add_search_callbacks).
+
+    Returns:
+        tuple: (manager, routing, solution)
+    """
+    manager, routing = build_routing_model(
+        distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot,
+        optimize_by or get_optimize_by(), candidate_k, candidate_mode,
+    )
+    add_search_callbacks(routing, manager, on_solution, should_stop, target_objective)
+
+    # Solve the problem
+    solution = routing.SolveWithParameters(search_parameters or get_search_parameters())
+    return manager, routing, solution
+
+def restore_solution(routes, distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot,
+                     optimize_by=None):
+    """Rebuilds the model and an assignment for known routes without searching.
+
+    Used when routes were found elsewhere (another process, a cache) but the caller
+    needs manager/routing/solution objects, e.g. for print_solution.
+
+    Args:
+        routes (list): Routes as returned by helper.routes.get_routes (depot at both ends).
+
+    Returns:
+        tuple: (manager, routing, solution); solution is None if the routes are infeasible.
+    """
+    manager, routing = build_routing_model(
+        distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot,
+        optimize_by or get_optimize_by(),
+    )
+    routing.CloseModelWithParameters(get_search_parameters())
+    solution = routing.ReadAssignmentFromRoutes([route[1:-1] for route in routes], True)
+    return manager, routing, solution
@@ -0,0 +1,32 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# Searches running at once across all sessions; more requests wait in the pool's queue
+SOLVER_PROCESSES = int(os.getenv("SOLVER_PROCESSES", os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_solver_pool():
+    """The process pool shared by all sessions, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked, like helper.solve_jobs: the app's sqlite connections and threads must not leak in
+            _pool = ProcessPoolExecutor(max_workers=SOLVER_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+async def run_in_solver_pool(function, *args, **kwargs):
+    """Await a CPU-bound function in the solver pool without blocking the event loop.
+
+    The function and its arguments must be picklable (module-level functions,
+    NumPy arrays, plain data).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_solver_pool(), partial(function, *args, **kwargs))
@@ -0,0 +1,31 @@
+import time
+from contextlib import contextmanager
+
+# Function to time a pipeline stage
+@contextmanager
+def stage(timings, name):
+    """Adds the wall time of the block, in seconds, to timings[name].
+
+    Does nothing when timings is None, so callers can always wrap their stages.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = round(timings.get(name, 0) + time.perf_counter() - started, 4)
+
+def solver_stats(routing, solution):
+    """Returns the objective and search effort of a solved RoutingModel.
+
+    routing is None when no model was solved here (e.g. a decomposed or portfolio
+    solve that found no plan), and every stat is then None.
+    """
+    if routing is None:
+        return {"objective": None, "branches": None, "failures": None, "solutions": None}
+    return {
+        "objective": solution.ObjectiveValue() if solution else None,
+        "branches": routing.solver().Branches(),
+        "failures": routing.solver().Failures(),
+        "solutions": routing.solver().Solutions(),
+    }
@@ -3,11 +3,12 @@ import os
 import streamlit as st
 
 weather_api_key = os.getenv("WEATHER_API_KEY")
-WEATHER_BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
+# OpenWeatherMap API root; only the current-weather endpoint is used
+WEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org").rstrip("/") + "/data/2.5/weather"
 
 def get_weather(city: str) -> str:
     url = f"{WEATHER_BASE_URL}?q={city}&appid={weather_api_key}&units=metric"
-    response = requests.get(url)
+    response = requests.get(url, timeout=10)
 
     weather_report = {}
 
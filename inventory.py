@@ -1,67 +1,63 @@
 """
 This script processes inventory and orders data, fulfilling orders based on available stock. 
-It also extracts addresses from orders and saves them to a file for further processing.
+It also extracts addresses from orders for further processing.
+
+Data lives in the SQLite store of inventory_db.py, imported from inventory.json/orders.json on first use.
 """
-import json
+import inventory_db
+from helper import order_stream
 
 
 def load_inventory():
-    with open('inventory.json', 'r') as f:
-        return json.load(f)
+    return inventory_db.get_inventory()
 
 def load_orders():
-    with open('orders.json', 'r') as f:
-        return json.load(f)
-    
-def retrieve_addresses_and_demands():
-    orders = load_orders()
-    addresses_and_demands = []
-    for order in orders:
-        fullfilled = all(item['fullfilled'] for item in order['items'])
-        if fullfilled:
-            continue
-        demands = sum(item['quantity'] for item in order['items'])
-        addresses_and_demands.append((order['destination'], demands))
+    return inventory_db.get_orders()
+
+def stream_orders(path=None):
+    """Yield orders one at a time from the store, or from a JSON array/JSONL feed at path."""
+    if path is None:
+        return inventory_db.iter_orders()
+    return order_stream.iter_orders(path)
     
-    return addresses_and_demands
+def retrieve_addresses_and_demands(orders=None):
+    """(destination, demand) of every open order.
+
+    Args:
+        orders (iterable): Optional stream of orders, e.g. stream_orders("feed.jsonl"), filtered
+            on the fly; by default the store is queried.
+    """
+    return [(destination, demands) for _, destination, demands in retrieve_stops(orders)]
+
+def retrieve_stops(orders=None):
+    """(order_id, destination, demand) of every open order, from the store or an optional stream."""
+    if orders is not None:
+        return list(order_stream.iter_stops(orders))
+    # Orders that are not completely fulfilled, aggregated by the index on order status
+    return inventory_db.get_open_stops()
 
 def fulfill_orders(inventory_list, orders):
+    """Fulfill orders against the stored stock in one transaction and update the given lists in place."""
     inventory = {item['product_id']: item for item in inventory_list}
 
-    for order in orders:
-        print(f"\nProcessing Order {order['order_id']}...")
-
-        for item in order['items']:
-            product_id = item.get('product_id')
-            quantity = item.get('quantity')
-
-            product = inventory.get(product_id)
-            if not product:
-                print(f"  ❌ Product {product_id} not found.")
-                item['fullfilled'] = False 
-                continue
-            
-            product_name = product.get('name')
-            current_stock = product.get('stock')
-
-            if current_stock < quantity:
-                print(f"  ⚠️ Not enough stock for {product_name}-{product_id}. Needed: {quantity}, Available: {current_stock}")
-                item['fullfilled'] = False
-            else:
-                inventory[product_id]['stock'] -= quantity
-                print(f"  ✅ Fulfilled {quantity} of {product_name}-{product_id}. Remaining: {inventory[product_id]['stock']}")
-                item['fullfilled'] = True
-
-    # Save the updated inventory
-    updated_inventory = list(inventory.values())
-    with open('inventory.json', 'w') as f:
-        json.dump(updated_inventory, f, indent=2)
-        print("\n✔️ Inventory updated and saved.")
-
-    # Save the updated orders
-    with open('orders.json', 'w') as f:
-        json.dump(orders, f, indent=2)
-        print("✔️ Orders updated and saved.")
+    current_order = None
+    for order_id, product_id, quantity, outcome, remaining in inventory_db.fulfill(orders):
+        if order_id != current_order:
+            print(f"\nProcessing Order {order_id}...")
+            current_order = order_id
+
+        product = inventory.get(product_id)
+        product_name = product.get('name') if product else None
+        if outcome == "unknown":
+            print(f"  ❌ Product {product_id} not found.")
+        elif outcome == "insufficient":
+            print(f"  ⚠️ Not enough stock for {product_name}-{product_id}. Needed: {quantity}, Available: {remaining}")
+        else:
+            print(f"  ✅ Fulfilled {quantity} of {product_name}-{product_id}. Remaining: {remaining}")
+        if product:
+            product['stock'] = remaining
+
+    print("\n✔️ Inventory and orders updated and saved.")
 
 def display_inventory():
     inventory = load_inventory()
@@ -77,20 +73,13 @@ def display_inventory():
 
     return display_items
 
-def display_orders():
-    orders = load_orders()
+def display_orders(orders=None):
+    """Rows of unfulfilled items, from the store or from an optional stream of orders."""
+    items = order_stream.iter_unfulfilled_items(orders) if orders is not None else inventory_db.get_unfulfilled_items()
     display_orders = []
 
-    for order in orders:
-        for item in order['items']:
-            if not item['fullfilled'] and item['quantity'] > 0:
-                display_orders.append({
-                    'order_id': order['order_id'],
-                    'destination': order['destination'],
-                    'product_id': item['product_id'],
-                    'quantity': item['quantity'],
-                    'status': "Order not fulfilled"
-                })
+    for item in items:
+        display_orders.append({**item, 'status': "Order not fulfilled"})
 
     return display_orders
 
@@ -0,0 +1,276 @@
+"""
+SQLite store for inventory and orders, replacing the inventory.json/orders.json files.
+
+Orders are indexed by status and destination and order items by product, so
+open orders can be queried without loading everything. Fulfillment runs in a
+single transaction. On first use the store imports the existing JSON files;
+run `python inventory_db.py --import` to re-import them.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from helper.order_stream import iter_orders as iter_order_feed
+
+INVENTORY_DB = os.getenv("INVENTORY_DB", "inventory.db")
+INVENTORY_JSON = os.getenv("INVENTORY_JSON", "inventory.json")
+ORDERS_JSON = os.getenv("ORDERS_JSON", "orders.json")  # a JSON array or a .jsonl feed
+
+OPEN = "open"
+FULFILLED = "fulfilled"
+
+# Connect to the database (or create if not exists); the timeout waits out writers in other processes
+conn = sqlite3.connect(INVENTORY_DB, check_same_thread=False, timeout=30)
+lock = threading.Lock()
+conn.execute("PRAGMA journal_mode=WAL")  # Streamlit sessions read while another one fulfills
+conn.execute("PRAGMA foreign_keys=ON")
+
+conn.executescript('''
+    CREATE TABLE IF NOT EXISTS products (
+        product_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        stock INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS orders (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id TEXT NOT NULL UNIQUE,
+        destination TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'open',
+        priority INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS order_items (
+        order_id TEXT NOT NULL REFERENCES orders (order_id) ON DELETE CASCADE,
+        line INTEGER NOT NULL,
+        product_id TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        fulfilled INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (order_id, line)
+    );
+    CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status);
+    CREATE INDEX IF NOT EXISTS idx_orders_destination ON orders (destination);
+    CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items (product_id);
+''')
+# Stores created before orders had a priority
+if 'priority' not in [column[1] for column in conn.execute("PRAGMA table_info(orders)")]:
+    conn.execute("ALTER TABLE orders ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+conn.commit()
+
+
+def _order_status(items):
+    return FULFILLED if all(item['fullfilled'] for item in items) else OPEN
+
+
+def _write_orders(orders):
+    """Insert or replace orders with their items; call inside a transaction.
+
+    Returns:
+        int: Number of orders written; orders may be any iterable, including a stream.
+    """
+    count = 0
+    for order in orders:
+        count += 1
+        # A missing priority keeps the stored one (or 0 for new orders)
+        priority = order.get('priority')
+        conn.execute('''
+            INSERT INTO orders (order_id, destination, status, priority) VALUES (?, ?, ?, COALESCE(?, 0))
+            ON CONFLICT (order_id) DO UPDATE SET
+                destination = excluded.destination, status = excluded.status, priority = COALESCE(?, orders.priority)
+        ''', (order['order_id'], order['destination'], _order_status(order['items']), priority, priority))
+        conn.execute("DELETE FROM order_items WHERE order_id = ?", (order['order_id'],))
+        conn.executemany(
+            "INSERT INTO order_items (order_id, line, product_id, quantity, fulfilled) VALUES (?, ?, ?, ?, ?)",
+            [
+                (order['order_id'], line, item['product_id'], item['quantity'], int(bool(item['fullfilled'])))
+                for line, item in enumerate(order['items'])
+            ],
+        )
+    return count
+
+
+def import_json(inventory_path=INVENTORY_JSON, orders_path=ORDERS_JSON):
+    """Import (or re-import) products and orders from the JSON files, in one transaction.
+
+    Orders are streamed from the file (see helper.order_stream), so large feeds
+    are imported without loading them into memory.
+
+    Returns:
+        tuple: (number of products, number of orders) imported.
+    """
+    with open(inventory_path, 'r') as f:
+        inventory = json.load(f)
+
+    with lock, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO products (product_id, name, stock) VALUES (?, ?, ?)",
+            [(item['product_id'], item['name'], item['stock']) for item in inventory],
+        )
+        order_count = _write_orders(iter_order_feed(orders_path))
+    print(f"📦 Imported {len(inventory)} products and {order_count} orders into {INVENTORY_DB}")
+    return len(inventory), order_count
+
+
+def _import_if_empty():
+    with lock:
+        empty = conn.execute(
+            "SELECT NOT EXISTS (SELECT 1 FROM products) AND NOT EXISTS (SELECT 1 FROM orders)"
+        ).fetchone()[0]
+    if empty and os.path.exists(INVENTORY_JSON) and os.path.exists(ORDERS_JSON):
+        import_json()
+
+
+def get_inventory():
+    """All products as dicts with product_id, name and stock."""
+    with lock:
+        rows = conn.execute("SELECT product_id, name, stock FROM products ORDER BY product_id").fetchall()
+    return [{'product_id': product_id, 'name': name, 'stock': stock} for product_id, name, stock in rows]
+
+
+def iter_orders(status=None):
+    """Stream orders in their original shape (order_id, destination, items), optionally only one status.
+
+    Rows are read through a separate connection, which sees a consistent snapshot
+    and does not block other sessions while the stream is consumed.
+    """
+    query = '''
+        SELECT o.order_id, o.destination, i.product_id, i.quantity, i.fulfilled
+        FROM orders o JOIN order_items i ON i.order_id = o.order_id
+    '''
+    params = ()
+    if status is not None:
+        query += " WHERE o.status = ?"
+        params = (status,)
+    query += " ORDER BY o.seq, i.line"
+
+    reader = sqlite3.connect(INVENTORY_DB, timeout=30)
+    try:
+        order = None
+        # Items of one order are consecutive, so each order is complete when the next one starts
+        for order_id, destination, product_id, quantity, fulfilled in reader.execute(query, params):
+            if order is None or order['order_id'] != order_id:
+                if order is not None:
+                    yield order
+                order = {'order_id': order_id, 'destination': destination, 'items': []}
+            order['items'].append({'product_id': product_id, 'quantity': quantity, 'fullfilled': bool(fulfilled)})
+        if order is not None:
+            yield order
+    finally:
+        reader.close()
+
+
+def get_orders(status=None):
+    """Orders in their original shape (order_id, destination, items), optionally only one status."""
+    return list(iter_orders(status))
+
+
+def get_open_stops():
+    """(order_id, destination, total quantity) of every order that is not completely fulfilled, in order."""
+    with lock:
+        return conn.execute('''
+            SELECT o.order_id, o.destination, SUM(i.quantity)
+            FROM orders o JOIN order_items i ON i.order_id = o.order_id
+            WHERE o.status = ?
+            GROUP BY o.seq ORDER BY o.seq
+        ''', (OPEN,)).fetchall()
+
+
+def get_unfulfilled_items():
+    """Unfulfilled items with a positive quantity, joined with their order's destination."""
+    with lock:
+        rows = conn.execute('''
+            SELECT o.order_id, o.destination, i.product_id, i.quantity
+            FROM orders o JOIN order_items i ON i.order_id = o.order_id
+            WHERE o.status = ? AND i.fulfilled = 0 AND i.quantity > 0
+            ORDER BY o.seq, i.line
+        ''', (OPEN,)).fetchall()
+    return [
+        {'order_id': order_id, 'destination': destination, 'product_id': product_id, 'quantity': quantity}
+        for order_id, destination, product_id, quantity in rows
+    ]
+
+
+def fulfill(orders):
+    """Fulfill order items against the stored stock in one transaction.
+
+    Stock is decremented with a conditional UPDATE, so two sessions can never
+    oversell a product. Items are marked fulfilled in place and the orders are
+    saved with their new status. If anything fails, nothing is written.
+
+    Args:
+        orders (list): Orders in their original shape; orders not in the store are added.
+
+    Returns:
+        list: One (order_id, product_id, quantity, outcome, remaining stock) tuple per
+              processed item, where outcome is "fulfilled", "insufficient" or "unknown".
+    """
+    outcomes = []
+    with lock, conn:
+        for order in orders:
+            for item in order['items']:
+                product_id, quantity = item.get('product_id'), item.get('quantity')
+                if item.get('fullfilled'):
+                    continue
+                updated = conn.execute(
+                    "UPDATE products SET stock = stock - ? WHERE product_id = ? AND stock >= ?",
+                    (quantity, product_id, quantity),
+                ).rowcount
+                row = conn.execute("SELECT stock FROM products WHERE product_id = ?", (product_id,)).fetchone()
+                if row is None:
+                    outcome = "unknown"
+                else:
+                    outcome = "fulfilled" if updated else "insufficient"
+                item['fullfilled'] = bool(updated)
+                outcomes.append((order['order_id'], product_id, quantity, outcome, row[0] if row else None))
+        _write_orders(orders)
+    return outcomes
+
+
+def get_open_lines():
+    """Unfulfilled order lines of open orders, in arrival order, for batch allocation.
+
+    Returns:
+        list: (seq, priority, order_id, line, product_id, quantity) tuples.
+    """
+    with lock:
+        return conn.execute('''
+            SELECT o.seq, o.priority, o.order_id, i.line, i.product_id, i.quantity
+            FROM orders o JOIN order_items i ON i.order_id = o.order_id
+            WHERE o.status = ? AND i.fulfilled = 0
+            ORDER BY o.seq, i.line
+        ''', (OPEN,)).fetchall()
+
+
+def apply_allocation(stock_used, fulfilled_lines, fulfilled_orders):
+    """Write a batch allocation back in one transaction, touching only changed records.
+
+    Args:
+        stock_used (list): (product_id, quantity) pairs to take from stock.
+        fulfilled_lines (list): (order_id, line) pairs of newly fulfilled items.
+        fulfilled_orders (list): order_ids whose items are now all fulfilled.
+
+    Raises:
+        RuntimeError: If stock was taken by another session since the allocation was
+            computed; nothing is written and the allocation should be recomputed.
+    """
+    with lock, conn:
+        for product_id, quantity in stock_used:
+            updated = conn.execute(
+                "UPDATE products SET stock = stock - ? WHERE product_id = ? AND stock >= ?",
+                (quantity, product_id, quantity),
+            ).rowcount
+            if not updated:
+                raise RuntimeError(f"Stock of {product_id} changed during allocation, nothing was written")
+        conn.executemany("UPDATE order_items SET fulfilled = 1 WHERE order_id = ? AND line = ?", fulfilled_lines)
+        conn.executemany("UPDATE orders SET status = ? WHERE order_id = ?", [(FULFILLED, order_id) for order_id in fulfilled_orders])
+
+
+_import_if_empty()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--import", dest="import_json", action="store_true",
+                        help="(re-)import inventory.json and orders.json")
+    args = parser.parse_args()
+    if args.import_json:
+        import_json()
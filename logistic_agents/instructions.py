@@ -16,5 +16,15 @@ VRP_INSTRUCTIONS = """
               "plan_output": "...",
               "explanation": "...",
               "user_query": "...",
+              "cache": "hit" or "miss", copied from the tool result
             }
             """
+
+VRP_STRUCTURED_INSTRUCTIONS = """
+            You are a supply chain expert. Given the user query, extract:
+            - Number of vehicles
+            - Vehicle capacity
+            - Depot (optional, default: 0)
+            Do NOT ask for delivery addresses or demands — they are retrieved automatically.
+            Call solve_vrp_tool with these parameters. Its result is returned to the app as is, so do not write any other answer.
+            """
@@ -2,7 +2,7 @@ from agents import Agent, AsyncOpenAI, OpenAIChatCompletionsModel, Runner, set_t
 from tools.conversation import get_recent_conversations_tool
 from tools.solve_vrp import solve_vrp_tool
 from helper.set_user import set_current_user
-from .instructions import VRP_INSTRUCTIONS
+from .instructions import VRP_INSTRUCTIONS, VRP_STRUCTURED_INSTRUCTIONS
 
 import os
 
@@ -27,6 +27,7 @@ class VRPAssistant:
         self.user_id = user_id
         set_current_user(user_id)  # Set the current user context
         self.assistant = self._create_assistant()
+        self.structured_assistant = self._create_structured_assistant()
 
     def _create_assistant(self):
         return Agent(
@@ -36,9 +37,32 @@ class VRPAssistant:
             tools=[solve_vrp_tool, get_recent_conversations_tool],
         )
 
+    def _create_structured_assistant(self):
+        # The run stops as soon as solve_vrp_tool returns and its raw result becomes the final output,
+        # so the model never re-serializes routes and coordinates
+        return Agent(
+            name="VRP Parameter Extractor",
+            instructions=VRP_STRUCTURED_INSTRUCTIONS,
+            model=model,
+            tools=[solve_vrp_tool],
+            tool_use_behavior={"stop_at_tool_names": ["solve_vrp_tool"]},
+        )
+
     def run(self, query):
         return Runner.run_sync(self.assistant, query)
 
+    def run_structured(self, query):
+        """Runs one model call to extract the parameters and returns the tool result (a dict or an error string)."""
+        return Runner.run_sync(self.structured_assistant, query).final_output
+
+    async def run_async(self, query):
+        return await Runner.run(self.assistant, query)
+
+    async def run_structured_async(self, query):
+        """Async run_structured, for callers that serve many sessions on one event loop."""
+        result = await Runner.run(self.structured_assistant, query)
+        return result.final_output
+
 # Example usage
 if __name__ == "__main__":
     user_query = """
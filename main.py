@@ -5,15 +5,103 @@ if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
 from streamlit_folium import st_folium
-from helper.map import create_map
+from helper.map import build_route_layers, render_map
 import streamlit as st
 from logistic_agents.vrp_agent_runner import VRPAssistant
-from helper.clean_output import clean_output
-from helper.map_tile import set_tile, tile_providers
+from helper.query_parser import parse_vrp_query
+from helper.map_tile import tile_providers
 from helper.optimize_by import set_optimize_by
 from db_config import save_conversation
 from inventory import display_inventory, display_orders
-from route_optimization import solve_tsp
+from helper.solve_jobs import submit as submit_job, get_status as get_job_status, cancel as cancel_job, stop as stop_job
+
+def store_vrp_result(output_dict):
+    """Keep a VRP plan in session state for the summary, the map and the conversation log."""
+    st.session_state.explanation = output_dict.get('explanation', '')
+    st.session_state.routes = output_dict.get('routes', [])
+    st.session_state.coordinates = output_dict.get('coordinates', [])
+    st.session_state.addresses = output_dict.get('addresses', [])
+    st.session_state.demands = output_dict.get('demands', [])
+    st.session_state.plan_output = output_dict.get('plan_output', '')
+    st.session_state.user_query = output_dict.get('user_query', '')
+    st.session_state.pop("vrp_layers", None)  # new solution, rebuild the map layers
+    st.session_state.vrp_cache_hit = output_dict.get('cache') == 'hit'
+
+def store_tsp_result(output_dict):
+    """Keep a TSP plan in session state for the summary, the map and the conversation log."""
+    st.session_state.plan_output_tsp = output_dict['plan_output']
+    st.session_state.routes_tsp = output_dict['routes']
+    st.session_state.coordinates_tsp = output_dict['coordinates']
+    st.session_state.addresses_tsp = output_dict['addresses']
+    st.session_state.demands_tsp = output_dict['demands']
+    st.session_state.pop("tsp_layers", None)  # new solution, rebuild the map layers
+    st.session_state.tsp_cache_hit = output_dict.get('cache') == 'hit'
+
+# Function to follow a background solve job
+@st.fragment(run_every=1)
+def job_progress(job_param, store_result):
+    """Polls the job whose ID is in the URL parameter job_param, with stop and cancel buttons.
+
+    While the search runs, its best plan so far is drawn with straight lines, so the
+    first feasible plan shows up quickly and is redrawn as it improves. Keeping the
+    job ID in the URL lets a rerun or a browser refresh pick the job up again. Once
+    the job is done its result goes to store_result and the page reruns.
+    """
+    job_id = st.query_params.get(job_param)
+    if not job_id:
+        outcome = st.session_state.get(f"{job_param}_outcome")
+        if outcome:
+            st.warning(outcome)
+        return
+
+    status = get_job_status(job_id)
+    if status is None:
+        # Unknown job, e.g. the server restarted
+        del st.query_params[job_param]
+        return
+
+    if status["status"] == "queued":
+        st.info(f"⏳ Waiting for a free solver (position {status['queue_position']} in the queue)")
+    elif status["status"] == "running":
+        progress = f"⚙️ {status['stage'].capitalize()}, {status['elapsed_seconds']} s elapsed"
+        if status["objective"] is not None:
+            progress += f", best objective so far {status['objective']} ({status['solutions']} improvements)"
+        if status["eta_seconds"] is not None:
+            progress += f", about {status['eta_seconds']:.0f} s left"
+        st.info(progress)
+
+        best = status["best"]
+        if best:
+            # Preview without road geometry: no routing API calls per improvement
+            st_folium(
+                render_map(build_route_layers(
+                    best["coordinates"], best["addresses"], best["routes"], best["demands"], road_geometry=False
+                )),
+                width=700,
+                height=400,
+                key=f"{job_param}_preview",
+                returned_objects=[],
+            )
+    else:
+        del st.query_params[job_param]
+        if status["status"] == "done":
+            store_result(status["result"])
+            st.rerun(scope="app")
+        st.session_state[f"{job_param}_outcome"] = (
+            "Solve cancelled." if status["status"] == "cancelled" else f"Solve failed: {status['error']}"
+        )
+        st.rerun(scope="fragment")
+
+    if status["cancel_requested"]:
+        st.caption("Cancelling...")
+    elif status["stop_requested"]:
+        st.caption("Stopping, keeping the best plan...")
+    else:
+        stop_column, cancel_column = st.columns(2)
+        if stop_column.button("Stop and keep best plan", key=f"stop_{job_param}", use_container_width=True):
+            stop_job(job_id)
+        if cancel_column.button("Cancel", key=f"cancel_{job_param}", use_container_width=True):
+            cancel_job(job_id)
 
 # UI
 st.set_page_config(page_title="Vehicle Route Optimizer", page_icon="🗺️")
@@ -104,50 +192,60 @@ if st.experimental_user.is_logged_in:
             - Each vehicle can carry 5 items
             """)
 
+        # Progress of a running solve, also after a refresh
+        job_progress("vrp_job", store_vrp_result)
+
         if user_query:
             optimize_by = st.selectbox("Optimize by: ", ["Distance", "Time"])
+            target_objective = st.number_input(
+                "Good enough total cost (meters or seconds); 0 searches for the full time limit",
+                min_value=0,
+                value=0,
+                step=1000,
+            )
             if optimize_by:
                 # Set the optimization preference in config
                 set_optimize_by(optimize_by)
                 if st.button("Solve VRP and Show Map", use_container_width=True):
-                    with st.spinner("Optimizing route..."):
-                        try:
-                            try:
-                                loop = asyncio.get_event_loop()
-                            except RuntimeError:
-                                loop = asyncio.new_event_loop()
-                                asyncio.set_event_loop(loop)
-                                
-                            result = st.session_state.vrp_assistant.run(user_query)
-                            output = result.final_output
-                            st.session_state.output = output
-
-                            with st.expander("📝 Output"):
-                                st.write(output)
-
-                            # Clean and verify output
-                            output_dict = clean_output(output)                 
-                            
+                    st.session_state.pop("vrp_job_outcome", None)
+                    try:
+                        # Fast path: plain "N vehicles, capacity C" queries are parsed locally, no model call.
+                        # The solve runs as a background job, so reruns, refreshes and other users aren't blocked.
+                        parameters = parse_vrp_query(user_query)
+                        if parameters:
+                            st.query_params["vrp_job"] = submit_job(
+                                "vrp", query=user_query, optimize_by=optimize_by,
+                                target_objective=target_objective or None, **parameters
+                            )
+                        else:
+                            with st.spinner("Optimizing route..."):
+                                try:
+                                    loop = asyncio.get_event_loop()
+                                except RuntimeError:
+                                    loop = asyncio.new_event_loop()
+                                    asyncio.set_event_loop(loop)
+
+                                # One model call extracts the parameters; the tool result comes back as is
+                                output_dict = loop.run_until_complete(
+                                    st.session_state.vrp_assistant.run_structured_async(user_query)
+                                )
+
                             if isinstance(output_dict, dict):
-                                # Store solution components in session state
-                                st.session_state.explanation = output_dict.get('explanation', '')
-                                st.session_state.routes = output_dict.get('routes', [])
-                                st.session_state.coordinates = output_dict.get('coordinates', [])
-                                st.session_state.addresses = output_dict.get('addresses', [])
-                                st.session_state.demands = output_dict.get('demands', [])
-                                st.session_state.plan_output = output_dict.get('plan_output', '')
-                                st.session_state.user_query = output_dict.get('user_query', '')
-                                
+                                store_vrp_result(output_dict)
                             else:
-                                st.error("Unexpected response format from the route optimizer")
+                                st.error(output_dict if isinstance(output_dict, str) else "Unexpected response format from the route optimizer")
 
-                        except Exception as e:
-                            st.error(f"Error solving VRP: {str(e)}")
-                            st.error("Please check your query format and try again")
+                        with st.expander("📝 Output"):
+                            st.write(parameters or "Parameters extracted by the assistant")
 
+                    except Exception as e:
+                        st.error(f"Error solving VRP: {str(e)}")
+                        st.error("Please check your query format and try again")
 
             # Only show map if we have valid routes
             if "routes" in st.session_state and st.session_state.routes:
+                if st.session_state.get("vrp_cache_hit"):
+                    st.info("⚡ Orders, fleet and objective are unchanged: reused the stored plan.")
                 st.write("✅ Route optimization completed!")
                 st.subheader("🛣️ **Optimized VRP Solution:**")
                 st.write(st.session_state.explanation)
@@ -170,49 +268,46 @@ if st.experimental_user.is_logged_in:
                 for i, route in enumerate(st.session_state.routes):
                     st.write(f"Route {i + 1}: {' → '.join(str(node) for node in route)}")
 
-                # Tile selector
+                # Tile selector (per session, applied at render time)
                 selected_tile = st.selectbox("Select a map tile:", list(tile_providers.keys()), key="vrp_tile_selector")
-                set_tile(selected_tile)
 
-                # Generate map only if it doesn't exist or tile has changed
+                # Build route layers once per solution; tile changes only re-render
                 st.subheader("Optimized VRP Route Map")
-                if "vrp_map" not in st.session_state or st.session_state.get("last_tile") != selected_tile:
+                if "vrp_layers" not in st.session_state:
                     with st.spinner("Generating map..."):
-                        st.session_state.vrp_map = create_map(
+                        st.session_state.vrp_layers = build_route_layers(
                             st.session_state.coordinates,
                             st.session_state.addresses,
                             st.session_state.routes,
                             st.session_state.demands
                         )
-                        st.session_state.last_tile = selected_tile
 
                 # Display the map
-                if "vrp_map" in st.session_state and st.session_state.vrp_map:
-                    st_folium(
-                        st.session_state.vrp_map,
-                        width=700,
-                        height=500,
-                        key="tsp_map",
-                        returned_objects=[]  # Prevent capturing map interactions
-                    )
+                st_folium(
+                    render_map(st.session_state.vrp_layers, selected_tile),
+                    width=700,
+                    height=500,
+                    key="vrp_map_view",
+                    returned_objects=[]  # Prevent capturing map interactions
+                )
 
     # TSP Optimization
     with tab3:
         st.subheader("TSP Optimization")
+        draft_tsp = st.checkbox("Draft mode (estimated distances, no routing API calls)", key="tsp_draft")
         if st.button("Solve TSP and Show Map", use_container_width=True):
-            with st.spinner("Optimizing route..."):
-                try:
-                    output, routes, coordinates, addresses, demands = solve_tsp()
-                    st.session_state.plan_output_tsp = output
-                    st.session_state.routes_tsp = routes
-                    st.session_state.coordinates_tsp = coordinates
-                    st.session_state.addresses_tsp = addresses
-                    st.session_state.demands_tsp = demands
-                except Exception as e:
-                    st.error(f"Error solving TSP: {str(e)}")
+            st.session_state.pop("tsp_job_outcome", None)
+            try:
+                st.query_params["tsp_job"] = submit_job("tsp", draft=draft_tsp)
+            except Exception as e:
+                st.error(f"Error solving TSP: {str(e)}")
+
+        job_progress("tsp_job", store_tsp_result)
 
         # Only show map if we have valid routes
         if "routes_tsp" in st.session_state and st.session_state.routes_tsp:
+            if st.session_state.get("tsp_cache_hit"):
+                st.info("⚡ Orders are unchanged: reused the stored plan.")
             st.write("✅ Route optimization completed!")
             st.subheader("🛣️ **Optimized TSP Solution:**")
             st.write(st.session_state.plan_output_tsp)
@@ -230,31 +325,28 @@ if st.experimental_user.is_logged_in:
                 st.session_state.plan_output_tsp
             )
 
-            # Tile selector
+            # Tile selector (per session, applied at render time)
             selected_tile = st.selectbox("Select a map tile:", list(tile_providers.keys()), key="tsp_tile_selector")
-            set_tile(selected_tile)
 
-            # Generate map only if it doesn't exist or tile has changed
+            # Build route layers once per solution; tile changes only re-render
             st.subheader("Optimized TSP Route Map")
-            if "tsp_map" not in st.session_state or st.session_state.get("last_tile") != selected_tile:
+            if "tsp_layers" not in st.session_state:
                 with st.spinner("Generating map..."):
-                    st.session_state.tsp_map = create_map(
+                    st.session_state.tsp_layers = build_route_layers(
                         st.session_state.coordinates_tsp,
                         st.session_state.addresses_tsp,
                         st.session_state.routes_tsp,
                         st.session_state.demands_tsp,
                     )
-                    st.session_state.last_tile = selected_tile
 
             # Display the map
-            if "tsp_map" in st.session_state and st.session_state.tsp_map:
-                st_folium(
-                    st.session_state.tsp_map,
-                    width=700,
-                    height=500,
-                    key="tsp_map",
-                    returned_objects=[]  # Prevent capturing map interactions
-                )
+            st_folium(
+                render_map(st.session_state.tsp_layers, selected_tile),
+                width=700,
+                height=500,
+                key="tsp_map_view",
+                returned_objects=[]  # Prevent capturing map interactions
+            )
 
     # Inventory Management Tab
     with tab4:
@@ -1,158 +1,565 @@
-from ortools.constraint_solver import routing_enums_pb2
-from ortools.constraint_solver import pywrapcp
-from helper.address_to_coordinates import get_coordinates
+import asyncio
+import time
+from helper.address_to_coordinates import geocode_many
 from helper.matrix import get_distance_duration_matrix
-from inventory import retrieve_addresses_and_demands
+from inventory import retrieve_stops
 from helper.optimize_by import get_optimize_by
-from helper.routes import get_routes
+from helper.routes import get_routes, routes_cost
 from helper.solution import print_solution
-import time
-
+from helper.solver import get_search_parameters, build_routing_model, solve_routing, add_search_callbacks
+from helper.portfolio import solve_portfolio, share_matrices, attach_matrices
+from helper.decomposition import solve_decomposed
+from helper.timing import stage, solver_stats
+from helper.consolidate import consolidate_by_destination, merge_nearby, STOP_MERGE_RADIUS_M
+from helper.neighbors import CANDIDATE_K, CANDIDATE_MODE
+from helper import solve_cache
+from helper.solver_pool import run_in_solver_pool
+
+
+def geocode_stops(addresses, demands, depot=0):
+    """Geocode all stops and drop the ones that failed, keeping addresses, demands and coordinates aligned.
+
+    Returns:
+        tuple: (addresses, demands, coordinates, depot) for the geocoded stops only,
+               with depot re-indexed into the filtered lists.
+    """
+    coordinates, kept = _geocode_kept(addresses, depot)
+    return (
+        [addresses[i] for i in kept],
+        [demands[i] for i in kept],
+        coordinates,
+        kept.index(depot),
+    )
 
-def solve_vrp(addresses, demands, vehicle_capacities, num_vehicles, depot):
-    """Solves the Vehicle Routing Problem (VRP) with capacity constraints."""
+def _geocode_kept(addresses, depot):
+    """Geocode addresses and return (coordinates, kept) for the ones that succeeded."""
+    coordinates, failed = geocode_many(addresses)
+    if depot in failed:
+        raise ValueError(f"Could not geocode depot address: {addresses[depot]}")
+
+    for i in failed:
+        print(f"⚠️ Skipping stop {i} ({addresses[i]}): address could not be geocoded")
+
+    kept = [i for i, coord in enumerate(coordinates) if coord is not None]
+    for i in kept:
+        print(f"📍 {addresses[i]} → {coordinates[i]}")
+    print('Coordinates: ', [coordinates[i] for i in kept])
+    return [coordinates[i] for i in kept], kept
+
+def prepare_stops(stops, depot=0, merge_radius_m=STOP_MERGE_RADIUS_M):
+    """Consolidate orders into stops and geocode them.
+
+    Orders to the same normalized destination become one stop with the summed
+    demand, before geocoding, so every later stage works on fewer nodes. With a
+    merge_radius_m, geocoded stops that close to each other are merged as well.
+
+    Args:
+        stops (list): (order_id, destination, demand) tuples, e.g. from inventory.retrieve_stops.
+        depot (int): Index of the depot order.
+        merge_radius_m (float): Merge stops within this many meters; 0 or None disables it.
+
+    Returns:
+        tuple: (addresses, demands, coordinates, depot, order_ids) where order_ids[i]
+               lists the orders served at stop i.
+    """
+    addresses, demands, order_ids, depot = consolidate_by_destination(stops, depot)
+    coordinates, kept = _geocode_kept(addresses, depot)
+    addresses = [addresses[i] for i in kept]
+    demands = [demands[i] for i in kept]
+    order_ids = [order_ids[i] for i in kept]
+    depot = kept.index(depot)
+
+    if merge_radius_m:
+        kept, demands, order_ids, depot = merge_nearby(coordinates, demands, order_ids, merge_radius_m, depot)
+        addresses = [addresses[i] for i in kept]
+        coordinates = [coordinates[i] for i in kept]
+
+    return addresses, demands, coordinates, depot, order_ids
+
+def solve_vrp(addresses, demands, vehicle_capacities, num_vehicles, depot, draft=False, portfolio=False, decompose=False,
+              coordinates=None, matrices=None, time_limit=10, report=None, optimize_by=None, on_solution=None,
+              should_stop=None, target_objective=None, candidate_k=None, candidate_mode="penalize"):
+    """Solves the Vehicle Routing Problem (VRP) with capacity constraints.
+
+    With draft=True the matrix is estimated from great-circle distances instead of fetched.
+    With portfolio=True several search strategies are raced on all cores (see helper.portfolio).
+    With decompose=True stops are clustered and solved as parallel sub-VRPs (see helper.decomposition),
+    for instances too large for a single model.
+
+    Passing coordinates skips geocoding and passing matrices, a (distance, duration) pair,
+    skips the routing API, so benchmarks can run offline. If report is a dict it is filled
+    with the wall time per stage under "seconds" plus the objective and search effort.
+    For anytime use, on_solution is called with every improving solution as a dict (see
+    _publisher), should_stop ends the search early and so does reaching target_objective,
+    keeping the best plan found; none of them apply with portfolio or decompose.
+
+    candidate_k/candidate_mode restrict the single search to granular neighborhoods
+    (see helper.solver.build_routing_model). The objectives in report and in published
+    solutions are then re-costed on the real matrix, without the "penalize" mode's
+    extra arc costs; target_objective is still compared to the penalized cost, which
+    is never below the real one.
+    """
+    optimize_by = optimize_by or get_optimize_by()
+    timings = report.setdefault("seconds", {}) if report is not None else None
 
     # Convert addresses to coordinates
-    coordinates = []
-    for address in addresses:
-        coord = get_coordinates(address)
-        if coord:
-            print(f"📍 {address} → {coord}")
-            coordinates.append(coord)
-        time.sleep(1)  # Respect rate limit
-
-    print('Coordinates: ', coordinates)
-
-    distance_matrix, duration_matrix = get_distance_duration_matrix(coordinates)
-    if distance_matrix is None:
-        print("Exiting due to distance matrix failure.")
-        return
+    with stage(timings, "geocode"):
+        if coordinates is None:
+            addresses, demands, coordinates, depot = geocode_stops(addresses, demands, depot)
+
+    with stage(timings, "matrix"):
+        if matrices is None:
+            distance_matrix, duration_matrix = get_distance_duration_matrix(coordinates, draft=draft)
+        else:
+            distance_matrix, duration_matrix = matrices
     print('Distance Matrix: ', distance_matrix)
     print('Duration Matrix: ', duration_matrix)
+    # Real costs of the objective, for plans searched on penalized arc costs
+    cost_matrix = None
+    if candidate_k:
+        cost_matrix = distance_matrix if optimize_by == 'Distance' or duration_matrix is None else duration_matrix
+
+    with stage(timings, "solve"):
+        if decompose:
+            manager, routing, solution, _ = solve_decomposed(
+                distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot, coordinates,
+                optimize_by=optimize_by, time_limit=time_limit,
+            )
+        elif portfolio:
+            manager, routing, solution, _ = solve_portfolio(
+                distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot,
+                optimize_by=optimize_by, time_limit=time_limit,
+            )
+        else:
+            manager, routing, solution = solve_routing(
+                distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot, optimize_by,
+                get_search_parameters(time_limit),
+                candidate_k=candidate_k,
+                candidate_mode=candidate_mode,
+                on_solution=_publisher(on_solution, coordinates, addresses, demands, cost_matrix),
+                should_stop=should_stop,
+                target_objective=target_objective,
+            )
 
+    # Get routes
+    with stage(timings, "routes"):
+        routes = get_routes(solution, routing, manager) if solution else []
 
-    # Create the routing index manager
-    manager = pywrapcp.RoutingIndexManager(len(distance_matrix), num_vehicles, depot)
+    if report is not None:
+        report.update(solver_stats(routing, solution))
+        if cost_matrix is not None and solution:
+            report["model_objective"] = report["objective"]
+            report["objective"] = routes_cost(routes, cost_matrix)
 
-    # Create Routing Model
-    routing = pywrapcp.RoutingModel(manager)
+    return manager, routing, solution, routes, coordinates, addresses, demands
 
-    # Create and register a transit callback
-    def distance_callback(from_index, to_index):
-        from_node = manager.IndexToNode(from_index)
-        to_node = manager.IndexToNode(to_index)
-        return int(distance_matrix[from_node][to_node])
+def _publisher(on_solution, coordinates, addresses, demands, cost_matrix=None):
+    """Adapts on_solution to the (objective, routes) search callback of helper.solver.
+
+    Every improving solution is published as a dict with objective, routes and
+    elapsed_seconds since the search started. The first one also carries the
+    coordinates, addresses and demands the routes index into, so a UI can draw
+    the first feasible plan right away and redraw it as it improves. With a
+    cost_matrix the objective is re-costed on it (see solve_vrp).
+    """
+    if on_solution is None:
+        return None
+    started = time.monotonic()
+    stops = {"coordinates": coordinates, "addresses": addresses, "demands": demands}
+
+    def publish(objective, routes):
+        on_solution({
+            "objective": routes_cost(routes, cost_matrix) if cost_matrix is not None else objective,
+            "routes": routes,
+            "elapsed_seconds": round(time.monotonic() - started, 2),
+            **stops,
+        })
+        stops.clear()
+
+    return publish
+
+def _vehicle_capacities(vehicle_capacity, num_vehicles):
+    """One capacity per vehicle from a single capacity or a per-vehicle list."""
+    if isinstance(vehicle_capacity, int):
+        return [vehicle_capacity] * num_vehicles
+    capacities = [int(capacity) for capacity in vehicle_capacity]
+    if len(capacities) == 1:
+        return capacities * num_vehicles
+    if len(capacities) != num_vehicles:
+        raise ValueError(f"Got {len(capacities)} vehicle capacities for {num_vehicles} vehicles")
+    return capacities
+
+def explain_plan(routes, demands, vehicle_capacities, order_ids):
+    """Short plain-language summary of a VRP plan, written without a model call."""
+    used = [route for route in routes if len(route) > 2]
+    stops = sum(len(route) - 2 for route in used)
+    orders = sum(len(order_ids[node]) for route in used for node in route[1:-1])
+    loads = ", ".join(
+        f"{sum(demands[node] for node in route[1:-1])}/{vehicle_capacities[vehicle]}"
+        for vehicle, route in enumerate(routes)
+    )
+    return (f"Served {stops} stops ({orders} orders) with {len(used)} of {len(routes)} vehicles. "
+            f"Vehicle loads: {loads}.")
+
+def _prepare_plan(vehicle_capacity, num_vehicles, depot, draft, optimize_by, time_limit, candidate_k, candidate_mode):
+    """Shared first steps of plan_vrp and plan_vrp_async: stops, fleet and solve cache lookup.
+
+    Returns:
+        tuple: (plan, cache_key, cached) where plan holds addresses, demands, coordinates,
+               depot, order_ids and vehicle_capacities, and cached is the stored result or None.
+    """
+    # Orders to the same destination are served as one stop
+    addresses, demands, coordinates, depot, order_ids = prepare_stops(retrieve_stops(), depot)
+    vehicle_capacities = _vehicle_capacities(vehicle_capacity, num_vehicles)
+
+    # Unchanged orders, fleet and objective: reuse the stored plan instead of searching again
+    cache_key = solve_cache.fingerprint(
+        coordinates, demands, vehicle_capacities, num_vehicles, depot, optimize_by, solver="vrp", draft=draft,
+        time_limit=time_limit, order_ids=order_ids, addresses=addresses,
+        candidate_k=candidate_k or None, candidate_mode=candidate_mode if candidate_k else None,
+    )
+    plan = {
+        "addresses": addresses,
+        "demands": demands,
+        "coordinates": coordinates,
+        "depot": depot,
+        "order_ids": order_ids,
+        "vehicle_capacities": vehicle_capacities,
+    }
+    return plan, cache_key, solve_cache.lookup(cache_key)
+
+def _finish_plan(query, plan, cache_key, routes, plan_output, cut_short):
+    """Shared last step of plan_vrp and plan_vrp_async: the result dict, cached unless the search was cut short."""
+    result = {
+        "routes": routes,  # List of routes
+        "coordinates": plan["coordinates"],  # List of (lat, lon) tuples
+        "addresses": plan["addresses"],  # List of address strings
+        "demands": plan["demands"],  # List of demands
+        "order_ids": plan["order_ids"],  # Orders served at each stop
+        "plan_output": plan_output,  # 👈 nicely formatted VRP solution as a string
+        "explanation": explain_plan(routes, plan["demands"], plan["vehicle_capacities"], plan["order_ids"]),
+    }
+    # A full search may find a better plan than one that was cut short
+    if not cut_short:
+        solve_cache.store(cache_key, result)
+    return {**result, "user_query": query, "cache": "miss"}
+
+def plan_vrp(query, vehicle_capacity, num_vehicles, depot=0, draft=False, optimize_by=None, time_limit=10,
+             on_solution=None, should_stop=None, target_objective=None, candidate_k=CANDIDATE_K,
+             candidate_mode=CANDIDATE_MODE):
+    """Plans routes for the open orders and returns the result as structured data.
+
+    Orders are consolidated into stops, identical instances are answered from the
+    solve cache, and the explanation is generated locally, so nothing here needs
+    a model call. This is what the app's solve jobs run (see helper.solve_jobs).
+
+    Args:
+        query (str): The user's query, echoed in the result.
+        vehicle_capacity (int | list): Capacity of every vehicle, or one per vehicle.
+        num_vehicles (int): Number of vehicles.
+        depot (int): Index of the depot order.
+        draft (bool): Use great-circle estimates instead of road distances.
+        optimize_by (str): "Distance" or "Time"; defaults to helper.optimize_by.
+        time_limit (int): Search time limit in seconds.
+        on_solution, should_stop, target_objective: Improving solutions and early stop, see solve_vrp.
+            A plan cut short by should_stop or target_objective is not cached, since a
+            full search may find a better one.
+        candidate_k, candidate_mode: Granular neighborhoods, see solve_vrp; default to the
+            CANDIDATE_K and CANDIDATE_MODE settings of helper.neighbors.
+
+    Returns:
+        dict: routes, coordinates, addresses, demands, order_ids, plan_output, explanation,
+              user_query and cache ("hit" or "miss"), or an error string if no plan was found.
+    """
+    optimize_by = optimize_by or get_optimize_by()
+    plan, cache_key, cached = _prepare_plan(
+        vehicle_capacity, num_vehicles, depot, draft, optimize_by, time_limit, candidate_k, candidate_mode
+    )
+    if cached:
+        return {**cached, "user_query": query, "cache": "hit"}
+
+    # Fetched here so the printed plan shows real distances whatever the arc costs
+    distance_matrix, duration_matrix = get_distance_duration_matrix(plan["coordinates"], draft=draft)
+    stopped = [False]
+
+    def stop_requested():
+        stopped[0] = stopped[0] or should_stop()
+        return stopped[0]
+
+    manager, routing, solution, routes, _, _, _ = solve_vrp(
+        addresses=plan["addresses"],
+        demands=plan["demands"],
+        vehicle_capacities=plan["vehicle_capacities"],
+        num_vehicles=num_vehicles,
+        depot=plan["depot"],
+        draft=draft,
+        coordinates=plan["coordinates"],
+        matrices=(distance_matrix, duration_matrix),
+        time_limit=time_limit,
+        optimize_by=optimize_by,
+        on_solution=on_solution,
+        should_stop=stop_requested if should_stop is not None else None,
+        target_objective=target_objective,
+        candidate_k=candidate_k,
+        candidate_mode=candidate_mode,
+    )
 
-    # Create and register duration callback
-    def duration_callback(from_index, to_index):
-        """Returns the duration between the two nodes."""
-        from_node = manager.IndexToNode(from_index)
-        to_node = manager.IndexToNode(to_index)
-        return int(duration_matrix[from_node][to_node])
+    if not solution:
+        return "No valid solution found. Please check your constraints."
 
+    plan_output = print_solution(
+        manager, routing, solution, plan["addresses"], plan["order_ids"], distance_matrix
+    )
+    return _finish_plan(query, plan, cache_key, routes, plan_output, stopped[0] or target_objective is not None)
+
+def _solve_plan_worker(spec, demands, vehicle_capacities, num_vehicles, depot, optimize_by, time_limit, addresses,
+                       order_ids, target_objective=None, candidate_k=None, candidate_mode="penalize"):
+    """Worker: solves an instance shared with share_matrices and returns (routes, plan_output), or (None, None)."""
+    shm, (distance_matrix, duration_matrix) = attach_matrices(spec)
+    try:
+        manager, routing, solution = solve_routing(
+            distance_matrix, duration_matrix, demands, vehicle_capacities, num_vehicles, depot, optimize_by,
+            get_search_parameters(time_limit), candidate_k, candidate_mode, target_objective=target_objective,
+        )
+        if not solution:
+            return None, None
+        plan_output = print_solution(manager, routing, solution, addresses, order_ids, distance_matrix)
+    finally:
+        del distance_matrix, duration_matrix
+        shm.close()
+
+    return get_routes(solution, routing, manager), plan_output
+
+async def plan_vrp_async(query, vehicle_capacity, num_vehicles, depot=0, draft=False, optimize_by=None, time_limit=10,
+                         target_objective=None, candidate_k=CANDIDATE_K, candidate_mode=CANDIDATE_MODE):
+    """Async plan_vrp, for many concurrent sessions.
+
+    Database access, geocoding, the matrix fetch and cache access run on threads,
+    and the search runs in the shared solver process pool (see helper.solver_pool),
+    so the event loop is never blocked and concurrent solves spread over all cores.
+    The steps around the search are shared with plan_vrp. The worker process can't
+    call back into the caller, so streaming improving solutions and stopping on
+    demand are left to helper.solve_jobs; target_objective and the candidate options work
+    as in plan_vrp.
+
+    Args:
+        optimize_by (str): "Distance" or "Time"; read from helper.optimize_by here,
+            since worker processes don't share the app's setting.
+
+    Returns:
+        Same as plan_vrp.
+    """
+    optimize_by = optimize_by or get_optimize_by()
+    plan, cache_key, cached = await asyncio.to_thread(
+        _prepare_plan, vehicle_capacity, num_vehicles, depot, draft, optimize_by, time_limit, candidate_k,
+        candidate_mode,
+    )
+    if cached:
+        return {**cached, "user_query": query, "cache": "hit"}
 
-    distance_callback_index = routing.RegisterTransitCallback(distance_callback)
-    duration_callback_index = routing.RegisterTransitCallback(duration_callback)
+    distance_matrix, duration_matrix = await asyncio.to_thread(
+        get_distance_duration_matrix, plan["coordinates"], "drive", draft
+    )
 
-    # Define cost of each arc based on optimization preference
-    if get_optimize_by() == 'Distance':
-        routing.SetArcCostEvaluatorOfAllVehicles(distance_callback_index)
-    else:
-        routing.SetArcCostEvaluatorOfAllVehicles(duration_callback_index)
-
-    # Add Capacity constraint
-    def demand_callback(from_index):
-        from_node = manager.IndexToNode(from_index)
-        return demands[from_node]
-
-    demand_callback_index = routing.RegisterUnaryTransitCallback(demand_callback)
-    routing.AddDimensionWithVehicleCapacity(
-        demand_callback_index,
-        0,  # no slack
-        vehicle_capacities,  # vehicle maximum capacities
-        True,  # start cumul to zero
-        "Capacity")
-    
-    # Add Time Window constraint (using duration)
-    routing.AddDimension(
-        duration_callback_index,
-        0,  # no slack
-        86400,  # 24 hours max, adjust as needed
-        False,  # don't force start to zero.
-        "Time"
+    # Matrices go to the worker through shared memory instead of being pickled
+    shm, spec = share_matrices(distance_matrix, duration_matrix)
+    try:
+        routes, plan_output = await run_in_solver_pool(
+            _solve_plan_worker, spec, plan["demands"], plan["vehicle_capacities"], num_vehicles, plan["depot"],
+            optimize_by, time_limit, plan["addresses"], plan["order_ids"], target_objective, candidate_k,
+            candidate_mode,
+        )
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if routes is None:
+        return "No valid solution found. Please check your constraints."
+
+    return await asyncio.to_thread(
+        _finish_plan, query, plan, cache_key, routes, plan_output, target_objective is not None
     )
 
-    # Setting first solution heuristic
-    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-    search_parameters.first_solution_strategy = (routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC)
-    search_parameters.local_search_metaheuristic = (routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH)
-    search_parameters.time_limit.seconds = 10
+def _insert_stops(initial_routes, stops, distance_matrix, demands, vehicle_capacities, depot):
+    """Inserts stops into routes (without depot) at their cheapest capacity-feasible position."""
+    loads = [sum(demands[node] for node in route) for route in initial_routes]
+    for node in stops:
+        best = None
+        for vehicle, route in enumerate(initial_routes):
+            if loads[vehicle] + demands[node] > vehicle_capacities[vehicle]:
+                continue
+            path = [depot] + route + [depot]
+            for position in range(len(path) - 1):
+                a, b = path[position], path[position + 1]
+                delta = distance_matrix[a][node] + distance_matrix[node][b] - distance_matrix[a][b]
+                if best is None or delta < best[0]:
+                    best = (delta, vehicle, position)
+        if best is None:
+            # No vehicle has room: start from the least loaded one and let the search repair it
+            vehicle = loads.index(min(loads))
+            best = (0, vehicle, len(initial_routes[vehicle]))
+        _, vehicle, position = best
+        initial_routes[vehicle].insert(position, node)
+        loads[vehicle] += demands[node]
+    return initial_routes
+
+def reoptimize_vrp(previous_routes, addresses, demands, vehicle_capacities, num_vehicles, depot=0,
+                   added=None, removed=None, locked=None, time_limit=3, draft=False):
+    """Re-optimizes a previous VRP plan after manual changes, warm-starting from that plan.
+
+    Args:
+        previous_routes (list): Routes from helper.routes.get_routes, as node indices into addresses.
+        addresses (list): Addresses of the previous plan.
+        demands (list): Demands of the previous plan.
+        vehicle_capacities (list): Capacity per vehicle.
+        num_vehicles (int): Number of vehicles.
+        depot (int): Index of the depot in the previous plan; it cannot be removed.
+        added (list): (address, demand) tuples of new stops.
+        removed (list): Indices of previous stops to drop.
+        locked (list): Indices of previous stops that must stay on their current vehicle.
+        time_limit (int): Search time limit in seconds; warm starts need much less than a cold solve.
+        draft (bool): Use great-circle estimates instead of the routing API for new matrix pairs.
+
+    Returns:
+        tuple: Same as solve_vrp, with indices referring to the returned addresses.
+    """
+    added = added or []
+    removed = set(removed or [])
+    locked = set(locked or [])
+    if depot in removed:
+        raise ValueError("The depot cannot be removed from the plan")
+
+    # New stop list: surviving previous stops first, then added stops
+    kept = [i for i in range(len(addresses)) if i not in removed]
+    new_addresses = [addresses[i] for i in kept] + [address for address, _ in added]
+    new_demands = [demands[i] for i in kept] + [demand for _, demand in added]
+    origin = kept + [None] * len(added)  # previous index of every new stop
+
+    coordinates, failed = geocode_many(new_addresses)
+    for i in failed:
+        print(f"⚠️ Skipping stop {new_addresses[i]}: address could not be geocoded")
+    stops = [i for i in range(len(new_addresses)) if i not in set(failed)]
+    new_addresses = [new_addresses[i] for i in stops]
+    new_demands = [new_demands[i] for i in stops]
+    coordinates = [coordinates[i] for i in stops]
+    node_of = {origin[i]: node for node, i in enumerate(stops) if origin[i] is not None}
+    new_nodes = [node for node, i in enumerate(stops) if origin[i] is None]
+    new_depot = node_of[depot]
+
+    distance_matrix, duration_matrix = get_distance_duration_matrix(coordinates, draft=draft)
+
+    # Previous routes mapped to the new indices, without depot endpoints
+    initial_routes = [
+        [node_of[i] for i in route if i in node_of and i != depot]
+        for route in previous_routes[:num_vehicles]
+    ]
+    initial_routes += [[] for _ in range(num_vehicles - len(initial_routes))]
+    orphans = [node_of[i] for route in previous_routes[num_vehicles:] for i in route if i in node_of and i != depot]
+    initial_routes = _insert_stops(initial_routes, orphans + new_nodes, distance_matrix, new_demands, vehicle_capacities, new_depot)
+
+    manager, routing = build_routing_model(
+        distance_matrix, duration_matrix, new_demands, vehicle_capacities, num_vehicles, new_depot,
+        get_optimize_by(),
+    )
 
-    # Solve the problem
-    solution = routing.SolveWithParameters(search_parameters)
-    
-    # Get routes
-    routes = get_routes(solution, routing, manager)
+    # Locked stops keep their vehicle
+    for vehicle, route in enumerate(previous_routes[:num_vehicles]):
+        for i in route:
+            if i in locked and i in node_of and i != depot:
+                routing.VehicleVar(manager.NodeToIndex(node_of[i])).SetValue(vehicle)
 
-    return manager, routing, solution, routes, coordinates, addresses, demands
+    search_parameters = get_search_parameters(time_limit=time_limit)
+    routing.CloseModelWithParameters(search_parameters)
+    initial_solution = routing.ReadAssignmentFromRoutes(initial_routes, True)
 
-def solve_tsp():
-    """Entry point of the program."""
+    if initial_solution:
+        solution = routing.SolveFromAssignmentWithParameters(initial_solution, search_parameters)
+    else:
+        print("⚠️ Previous plan is not a valid starting point after the changes, solving from scratch")
+        solution = routing.SolveWithParameters(search_parameters)
 
-    addresses_and_demands = retrieve_addresses_and_demands()
-    addresses = [address for address, _ in addresses_and_demands]
-    demands = [demand for _, demand in addresses_and_demands]
+    routes = get_routes(solution, routing, manager) if solution else []
+    return manager, routing, solution, routes, coordinates, new_addresses, new_demands
 
+def solve_tsp(draft=False, addresses_and_demands=None, coordinates=None, matrices=None, report=None, use_cache=True,
+              on_solution=None, should_stop=None):
+    """Entry point of the program.
+
+    Stops default to the unfulfilled orders, consolidated by destination (see prepare_stops);
+    addresses_and_demands, coordinates, matrices and report work as in solve_vrp, for offline benchmarks.
+    An identical instance is answered from the solve cache (see helper.solve_cache) unless
+    use_cache=False; report["cache"] tells whether it was a "hit" or a "miss". on_solution and
+    should_stop work as in solve_vrp, and a search should_stop ended early is not cached.
+    """
+    timings = report.setdefault("seconds", {}) if report is not None else None
+
+    order_ids = None
     # Convert addresses to coordinates
-    coordinates = []
-    for address in addresses:
-        coord = get_coordinates(address)
-        if coord:
-            print(f"📍 {address} → {coord}")
-            coordinates.append(coord)
-        time.sleep(1)  # Respect rate limit
-
-    print('Coordinates: ', coordinates)
-
-    distance_matrix, duration_matrix = get_distance_duration_matrix(coordinates)
-    if distance_matrix is None:
-        print("Exiting due to distance matrix failure.")
-        return
+    with stage(timings, "geocode"):
+        if addresses_and_demands is None:
+            addresses, demands, coordinates, _, order_ids = prepare_stops(retrieve_stops())
+        else:
+            addresses = [address for address, _ in addresses_and_demands]
+            demands = [demand for _, demand in addresses_and_demands]
+            if coordinates is None:
+                addresses, demands, coordinates, _ = geocode_stops(addresses, demands)
+
+    if use_cache:
+        # The TSP search stops at its first solution, so there is no time limit to key on
+        cache_key = solve_cache.fingerprint(
+            coordinates, demands, [], 1, 0, "Distance", solver="tsp", draft=draft,
+            order_ids=order_ids, addresses=addresses,
+        )
+        cached = solve_cache.lookup(cache_key)
+        if report is not None:
+            report["cache"] = "hit" if cached else "miss"
+        if cached:
+            return cached["plan_output"], cached["routes"], coordinates, addresses, demands
+
+    with stage(timings, "matrix"):
+        if matrices is None:
+            distance_matrix, duration_matrix = get_distance_duration_matrix(coordinates, draft=draft)
+        else:
+            distance_matrix, duration_matrix = matrices
     print('Distance Matrix: ', distance_matrix)
     print('Duration Matrix: ', duration_matrix)
 
-    # Create the routing index manager
-    manager = pywrapcp.RoutingIndexManager(len(distance_matrix), 1, 0)
-    
-    # Create Routing Model.
-    routing = pywrapcp.RoutingModel(manager)
+    # A search that should_stop ended early is returned but not cached
+    stopped = [False]
 
-    def distance_callback(from_index, to_index):
-        """Returns the distance between the two nodes."""
-        # Convert from routing variable Index to distance matrix NodeIndex.
-        from_node = manager.IndexToNode(from_index)
-        to_node = manager.IndexToNode(to_index)
-        return distance_matrix[from_node][to_node]
+    def stop_requested():
+        stopped[0] = stopped[0] or should_stop()
+        return stopped[0]
 
-    transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+    with stage(timings, "solve"):
+        # Single vehicle starting at the first address, minimizing distance
+        manager, routing = build_routing_model(distance_matrix)
+        add_search_callbacks(
+            routing, manager, _publisher(on_solution, coordinates, addresses, demands),
+            stop_requested if should_stop is not None else None,
+        )
 
-    # Define cost of each arc.
-    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+        # Setting first solution heuristic.
+        search_parameters = get_search_parameters(time_limit=None, local_search_metaheuristic=None)
 
-    # Setting first solution heuristic.
-    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-    search_parameters.first_solution_strategy = (
-        routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
-    )
+        # Solve the problem.
+        solution = routing.SolveWithParameters(search_parameters)
 
-    # Solve the problem.
-    solution = routing.SolveWithParameters(search_parameters)
+    with stage(timings, "routes"):
+        # A search stopped before its first solution has no plan
+        if solution:
+            output = print_solution(manager, routing, solution, addresses, order_ids)
+        else:
+            output = "No valid solution found. Please check your constraints."
 
-    if solution:
-        output = print_solution(manager, routing, solution, addresses)
+        # Get routes
+        routes = get_routes(solution, routing, manager) if solution else []
 
-    # Get routes
-    routes = get_routes(solution, routing, manager)
+    if report is not None:
+        report.update(solver_stats(routing, solution))
+
+    if use_cache and solution and not stopped[0]:
+        solve_cache.store(cache_key, {"plan_output": output, "routes": routes})
 
     return output, routes, coordinates, addresses, demands
 
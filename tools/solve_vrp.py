@@ -1,51 +1,23 @@
 from agents import function_tool
-from helper.solution import print_solution
-from inventory import retrieve_addresses_and_demands
-from route_optimization import solve_vrp
+from route_optimization import plan_vrp_async
 from typing import List
 
 @function_tool
-def solve_vrp_tool(query: str, vehicle_capacity: List[int], num_vehicles: int, depot: int = 0):
+async def solve_vrp_tool(query: str, vehicle_capacity: List[int], num_vehicles: int, depot: int = 0, draft: bool = False):
     """Solve the Vehicle Routing Problem (VRP) with the given parameters.
 
     Args:
-        vehicle_capacity: integer representing max capacity per vehicle. (e.g. [0, 5, 5, 5])
+        vehicle_capacity: max capacity of each vehicle, one integer per vehicle or a single one shared by all. (e.g. [5, 5, 5])
         num_vehicles: integer number of available vehicles. (e.g. 3)
         depot: integer index of depot location (usually 0)
         query: natural language query from which vehicle capacity, num_vehicles, and depot are extracted.
+        draft: set to true only if the user asks for a quick draft/estimate; uses straight-line distance estimates instead of road distances.
 
     Returns:
-        An object containing the solution routes, coordinates, addresses, demands, plan_output, and user_query.
+        An object containing the solution routes, coordinates, addresses, demands, order_ids, plan_output, explanation and user_query.
     """
-
-    addresses_and_demands = retrieve_addresses_and_demands() 
-        
-    # Solve VRP with parsed parameters
+    # Solve VRP with parsed parameters; the search runs in the solver process pool, off the event loop
     try:
-        manager, routing, solution, routes, coordinates, addresses, demands = solve_vrp(
-            addresses=[address for address, _ in addresses_and_demands],
-            demands=[demand for _, demand in addresses_and_demands],
-            vehicle_capacities=[vehicle_capacity] * num_vehicles,
-            num_vehicles=num_vehicles,
-            depot=depot
-        )
-        
-        if not solution:
-            return "No valid solution found. Please check your constraints."
-
-        # Get nicely formatted plan_output
-        plan_output = print_solution(manager, routing, solution, addresses)
-    
-        result = {
-            "routes": routes,  # List of routes
-            "coordinates": coordinates,  # List of (lat, lon) tuples
-            "addresses": addresses,  # List of address strings
-            "demands": demands,  # List of demands
-            "plan_output": plan_output,  # 👈 nicely formatted VRP solution as a string
-            "user_query": query,
-        }
-        
-        return result
-        
+        return await plan_vrp_async(query, vehicle_capacity, num_vehicles, depot, draft)
     except Exception as e:
         return f"Error solving VRP: {str(e)}"